@@ -0,0 +1,256 @@
+"""无界面批量渲染
+
+    python batch_render.py <配置目录> [-j 进程数] [--memory-per-job GB] [--force]
+
+递归查找配置目录中的json配置文件（gui保存的配置或者输出目录中的config.json，需要包含chart_type和csv_path），
+使用有限数量的进程依次渲染。每个视频渲染完成后在输出目录中写入渲染状态文件，
+配置和数据都没有变化时再次运行会跳过该视频。
+进度以每行一个json对象的形式输出到stdout，其它日志输出到stderr。
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import queue
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from enum import Enum
+from multiprocessing import Manager
+
+from data_video_generator import DataVideoGenerator, warm_up_fonts, PROFILE_REPORT_FILE_NAME
+
+RENDER_STATE_FILE_NAME = "渲染状态.json"
+
+
+# 渲染时写入输出目录的json文件，不是配置
+OUTPUT_FILE_NAMES = {RENDER_STATE_FILE_NAME, PROFILE_REPORT_FILE_NAME}
+
+
+# 生成器配置至少包含chart_type和csv_path，无法解析的文件仍然返回，渲染时报告为invalid
+def _is_generator_config(path):
+    try:
+        with open(path) as file:
+            content = json.load(file)
+    except (OSError, ValueError):
+        return True
+    return isinstance(content, dict) and 'chart_type' in content and 'csv_path' in content
+
+
+def find_config_files(config_dir):
+    config_files = []
+    for root, dirs, files in os.walk(config_dir):
+        # 跳过隐藏目录
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for file in sorted(files):
+            path = os.path.join(root, file)
+            if file.endswith('.json') and file not in OUTPUT_FILE_NAMES and _is_generator_config(path):
+                config_files.append(path)
+    return config_files
+
+
+def load_video_generator_params(config_path):
+    with open(config_path) as file:
+        raw_params = json.load(file)
+
+    # 兼容旧版本的配置
+    if 'chart_grid_label_color' in raw_params:
+        raw_params['tick_label_color'] = raw_params['chart_grid_label_color']
+    if not raw_params.get('output_dir'):
+        raw_params['output_dir'] = os.path.dirname(os.path.abspath(config_path))
+
+    params = dict()
+    for field in fields(DataVideoGenerator):
+        # progress_callback在配置中保存为字符串，不能使用
+        if field.name not in raw_params or field.name == 'progress_callback':
+            continue
+        value = raw_params[field.name]
+        # 枚举保存为"ChartType.H_BAR"的形式
+        if isinstance(field.type, type) and issubclass(field.type, Enum) and isinstance(value, str):
+            value = field.type[value.split('.')[-1]]
+        params[field.name] = value
+    return params
+
+
+def _get_file_signature(path):
+    if not path or not os.path.exists(path):
+        return None
+    if os.path.isdir(path):
+        # 目录本身的mtime在文件内容修改时不变，需要记录其中每一个文件
+        return [[file, *_get_file_signature(f"{path}/{file}")] for file in sorted(os.listdir(path))
+                if os.path.isfile(f"{path}/{file}")]
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+# 配置内容和输入文件的摘要，任何一个变化都需要重新渲染
+def get_job_fingerprint(config_path, params):
+    with open(config_path, 'rb') as file:
+        config_content = file.read()
+    input_signatures = [
+        _get_file_signature(params.get(name))
+        for name in ['csv_path', 'top_categories_group_file', 'background_image_path', 'category_icons_dir', 'champion_images_dir']
+    ]
+    return hashlib.sha1(config_content + repr(input_signatures).encode()).hexdigest()
+
+
+def _get_render_state_path(params):
+    return f"{params['output_dir']}/{RENDER_STATE_FILE_NAME}"
+
+
+def is_job_up_to_date(params, fingerprint):
+    state_path = _get_render_state_path(params)
+    if not os.path.exists(state_path):
+        return False
+    with open(state_path) as file:
+        state = json.load(file)
+    return state.get('fingerprint') == fingerprint and os.path.exists(state.get('video_save_path', ''))
+
+
+def _get_available_memory():
+    try:
+        with open('/proc/meminfo') as file:
+            for line in file:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+# 每个任务自身可能使用render_process_count个进程，总进程数不超过cpu核数，总内存不超过可用内存
+def get_worker_count(jobs, memory_per_job):
+    cpu_count = os.cpu_count() or 1
+    processes_per_job = max([max(1, job['params'].get('render_process_count', 1)) for job in jobs] or [1])
+    worker_count = max(1, cpu_count // processes_per_job)
+    available_memory = _get_available_memory()
+    if available_memory is not None:
+        memory_per_worker = memory_per_job * (1024 ** 3) * processes_per_job
+        worker_count = min(worker_count, max(1, int(available_memory // memory_per_worker)))
+    return max(1, min(worker_count, len(jobs)))
+
+
+def _emit(event, **info):
+    print(json.dumps({'event': event, 'time': round(time.time(), 3), **info}, ensure_ascii=False), flush=True)
+
+
+# 在子进程中执行
+def _render_job(job, event_queue):
+    config_path = job['config_path']
+    last_percent = [-1]
+
+    def progress_callback(i, n):
+        percent = int((i + 1) * 100 / n) if n else 100
+        if percent != last_percent[0]:
+            last_percent[0] = percent
+            event_queue.put(('progress', {'config': config_path, 'frame': i + 1, 'frame_count': n, 'percent': percent}))
+
+    start = time.time()
+    event_queue.put(('started', {'config': config_path, 'pid': os.getpid()}))
+    # 生成器的日志不能混入stdout中的进度信息
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            generator = DataVideoGenerator(**job['params'], progress_callback=progress_callback)
+            generator.generate()
+        finally:
+            # data_video_generator已经选择了Agg backend
+            import matplotlib.pyplot as plt
+            plt.close('all')
+
+    with open(_get_render_state_path(job['params']), 'w') as file:
+        json.dump({
+            'fingerprint': job['fingerprint'],
+            'config_path': os.path.abspath(config_path),
+            'video_save_path': generator.video_save_path,
+            'finished_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }, file, indent=4, ensure_ascii=False)
+    return {'video_save_path': generator.video_save_path, 'elapsed': round(time.time() - start, 3)}
+
+
+def run_batch(config_dir, worker_count=None, memory_per_job=2.0, force=False):
+    jobs = []
+    skipped_count = 0
+    output_dirs = set()
+    for config_path in find_config_files(config_dir):
+        try:
+            params = load_video_generator_params(config_path)
+            fingerprint = get_job_fingerprint(config_path, params)
+        except (OSError, ValueError, KeyError) as e:
+            _emit('invalid', config=config_path, error=repr(e))
+            continue
+        # gui保存的配置和输出目录中的config.json可能指向同一个输出目录
+        output_dir = os.path.abspath(params['output_dir'])
+        if output_dir in output_dirs:
+            skipped_count += 1
+            _emit('skipped', config=config_path, reason='duplicate_output_dir')
+            continue
+        output_dirs.add(output_dir)
+        if not force and is_job_up_to_date(params, fingerprint):
+            skipped_count += 1
+            _emit('skipped', config=config_path, reason='up_to_date')
+            continue
+        jobs.append({'config_path': config_path, 'params': params, 'fingerprint': fingerprint})
+
+    failed_count = 0
+    if jobs:
+        worker_count = worker_count or get_worker_count(jobs, memory_per_job)
+        # 在主进程中加载一次，子进程不需要重复加载
+        warm_up_fonts({
+            job['params'].get(field.name, field.default)
+            for job in jobs for field in fields(DataVideoGenerator) if field.name.endswith('_font_name')
+        })
+        _emit('batch_started', job_count=len(jobs), worker_count=worker_count)
+        with Manager() as manager, ProcessPoolExecutor(max_workers=worker_count) as executor:
+            event_queue = manager.Queue()
+            futures = dict()
+            for job in jobs:
+                futures[executor.submit(_render_job, job, event_queue)] = job['config_path']
+                _emit('queued', config=job['config_path'])
+
+            pending = set(futures)
+            while pending:
+                try:
+                    event, info = event_queue.get(timeout=0.5)
+                    _emit(event, **info)
+                except queue.Empty:
+                    pass
+                for future in [f for f in pending if f.done()]:
+                    pending.remove(future)
+                    # 先输出该任务剩余的进度信息
+                    while not event_queue.empty():
+                        event, info = event_queue.get()
+                        _emit(event, **info)
+                    try:
+                        _emit('finished', config=futures[future], **future.result())
+                    except Exception as e:
+                        failed_count += 1
+                        traceback.print_exception(e, file=sys.stderr)
+                        _emit('failed', config=futures[future], error=repr(e))
+
+    _emit('batch_finished', rendered_count=len(jobs) - failed_count, failed_count=failed_count,
+          skipped_count=skipped_count)
+    return failed_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量渲染配置目录中的所有视频")
+    parser.add_argument('config_dir', help="配置文件所在目录，会递归查找其中的json文件")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="同时渲染的任务数量，默认根据cpu核数和可用内存计算")
+    parser.add_argument('--memory-per-job', type=float, default=2.0,
+                        help="估计每个渲染进程占用的内存，单位：GB")
+    parser.add_argument('--force', action='store_true', help="忽略渲染状态，重新渲染所有视频")
+    args = parser.parse_args()
+
+    failed_count = run_batch(args.config_dir, args.workers, args.memory_per_job, args.force)
+    sys.exit(1 if failed_count else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""各个图表类型的渲染性能测试
+
+    python benchmarks/chart_types.py [--categories 50] [--periods 30] [--frames 60] [--output 结果文件]
+                                     [--compare 其它版本的结果文件]
+
+使用随机生成的csv和图标，每个图表类型在新的进程中运行（峰值内存互不影响）：
+创建DataVideoGenerator（数据预处理）、准备帧数据，然后在Agg backend上更新并绘制--frames帧。
+字体使用matplotlib自带的DejaVu Sans，不需要网络和系统字体。
+结果保存为json，通过--compare与其它提交的结果比较。
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+CHART_TYPES = ['H_BAR', 'V_BAR', 'GRID', 'GRID_AND_BAR', 'LINE_CHART']
+FONT_NAME = 'DejaVu Sans'
+
+# 各个图表类型需要的参数
+CHART_TYPE_PARAMS = {
+    'H_BAR': {'chart_top_n': 15, 'number_x_offset': 5, 'category_x_offset': -5, 'chart_number_font_size': 12},
+    # V_BAR的数值刻度在y轴上，tick_position只能是left或right；没有icon_x_offset的默认值
+    'V_BAR': {'chart_top_n': 15, 'chart_number_font_size': 12, 'tick_position': 'left', 'icon_x_offset': 0.3},
+    'GRID': {'chart_top_n': 20, 'category_x_offset': -5, 'number_x_offset': 0.1, 'number_y_offset': -0.2, 'icon_x_offset': 0.2},
+    # 排名过渡中的种类在top_n之外时GRID_AND_BAR会超出最后一列，显示所有种类
+    'GRID_AND_BAR': {'chart_top_n': None},
+    'LINE_CHART': {'category_x_offset': 5, 'chart_top_n': None},
+}
+
+
+def make_dataset(data_dir, category_count, period_count, seed=0):
+    rng = np.random.default_rng(seed)
+    categories = [f"Category {i}" for i in range(category_count)]
+    # 随机游走，保证排名经常变化
+    growth = rng.normal(1.05, 0.15, size=(period_count, category_count)).clip(0.5)
+    values = (rng.uniform(100, 1000, size=category_count) * np.cumprod(growth, axis=0)).round(2)
+
+    df = pd.DataFrame(values, columns=categories)
+    df.insert(0, 'Time', [f"{year}-12-31" for year in range(2020 - period_count + 1, 2021)])
+    df.to_csv(f"{data_dir}/data.csv", index=False)
+    # 折线图使用日期
+    df['Time'] = pd.date_range('2000-01-01', periods=period_count, freq='MS').strftime('%Y-%m-%d')
+    df.to_csv(f"{data_dir}/line.csv", index=False)
+
+    import matplotlib.pyplot as plt
+    icons_dir = f"{data_dir}/icons"
+    os.makedirs(icons_dir, exist_ok=True)
+    for i, category in enumerate(categories):
+        icon = np.zeros((64, 64, 4))
+        icon[..., :3] = rng.uniform(size=3)
+        icon[..., 3] = 1
+        plt.imsave(f"{icons_dir}/{category}.png", icon)
+
+
+def init_matplotlib():
+    logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.rcParams['font.sans-serif'] = [FONT_NAME]
+
+
+# 使用make_dataset的数据创建DataVideoGenerator，params覆盖默认参数和CHART_TYPE_PARAMS，其中的枚举可以使用名称
+def create_generator(chart_type_name, data_dir, **params):
+    from chart_constants import ChartType, StatisticsTime, ChartCategoryIconPosition, BarColorType, CategoryLabelPosition
+    from data_video_generator import DataVideoGenerator
+
+    chart_type = ChartType[chart_type_name]
+    output_dir = f"{data_dir}/{chart_type_name}"
+    os.makedirs(output_dir, exist_ok=True)
+    generator_params = dict(
+        chart_type=chart_type,
+        csv_path=f"{data_dir}/{'line' if chart_type is ChartType.LINE_CHART else 'data'}.csv",
+        output_dir=output_dir,
+        statistics_time=StatisticsTime.END_OF_THE_YEAR,
+        chart_category_icon_position=ChartCategoryIconPosition.HIDE,
+        category_icons_dir=f"{data_dir}/icons",
+        bar_color_type=BarColorType.RANDOM_COLOR,
+        frame_interval=50,
+        period_duration=1000,
+        rank_transition_duration=500,
+        last_frame_duration=2000,
+        first_frame_duration=0,
+        category_font_name=FONT_NAME,
+        time_font_name=FONT_NAME,
+        number_font_name=FONT_NAME,
+    )
+    generator_params.update(CHART_TYPE_PARAMS[chart_type_name])
+    generator_params.update(params)
+    for name, enum_class in [('chart_category_icon_position', ChartCategoryIconPosition), ('bar_color_type', BarColorType),
+                             ('category_label_position', CategoryLabelPosition)]:
+        if isinstance(generator_params.get(name), str):
+            generator_params[name] = enum_class[generator_params[name]]
+    return DataVideoGenerator(**generator_params)
+
+
+# generate()中第一帧之前的准备工作
+def prepare_rendering(generator):
+    generator._adjust_category_images_params()
+    generator._prepare_frame_plan()
+    generator.set_figure_background()
+    if generator.init_method:
+        generator.init_method()
+    return generator
+
+
+# 更新并在Agg backend上绘制一帧，返回RGBA像素的副本
+def render_frame(generator, frame_number):
+    generator.update_method(int(generator.frame_row_indices[frame_number]))
+    generator.fig.canvas.draw()
+    return np.asarray(generator.fig.canvas.buffer_rgba()).copy()
+
+
+# 在整个视频中均匀选取的帧号
+def get_sample_frames(generator, frame_count):
+    return np.linspace(0, generator.frame_count - 1, min(frame_count, generator.frame_count)).round().astype(int)
+
+
+def run_chart_type(chart_type_name, data_dir, frame_count, show_icons):
+    init_matplotlib()
+    import matplotlib.pyplot as plt
+
+    prepare_start = time.perf_counter()
+    generator = create_generator(chart_type_name, data_dir, chart_category_icon_position='LEFT' if show_icons else 'HIDE')
+    prepare_s = time.perf_counter() - prepare_start
+
+    setup_start = time.perf_counter()
+    prepare_rendering(generator)
+    setup_s = time.perf_counter() - setup_start
+
+    # 在整个视频中均匀选取，折线图每一帧的耗时与帧号有关
+    frames = get_sample_frames(generator, frame_count)
+    frame_times = []
+    for frame_number in frames:
+        frame_start = time.perf_counter()
+        render_frame(generator, frame_number)
+        frame_times.append(time.perf_counter() - frame_start)
+    plt.close('all')
+
+    # Linux上ru_maxrss的单位是KB，macOS上是字节
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / 1024 ** 2 if sys.platform == 'darwin' else peak_rss / 1024
+    frame_times = np.array(frame_times) * 1000
+    return {
+        'prepare_s': round(prepare_s, 4),
+        'setup_s': round(setup_s, 4),
+        'phases_s': {name: round(seconds, 4) for name, seconds in generator.profiler.phase_times.items()},
+        'video_frame_count': generator.frame_count,
+        'rendered_frame_count': len(frames),
+        'fps': round(len(frames) / (frame_times.sum() / 1000), 2),
+        'frame_p50_ms': round(float(np.percentile(frame_times, 50)), 2),
+        'frame_p90_ms': round(float(np.percentile(frame_times, 90)), 2),
+        'peak_rss_mb': round(peak_rss_mb, 1),
+    }
+
+
+def run_in_subprocess(chart_type_name, data_dir, args):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', chart_type_name, '--data-dir', data_dir,
+               '--frames', str(args.frames)]
+    if args.no_icons:
+        command.append('--no-icons')
+    result = subprocess.run(command, capture_output=True, text=True, cwd=REPO_DIR)
+    if result.returncode != 0:
+        return {'error': (result.stderr.strip().splitlines() or ['unknown error'])[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _get_git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=REPO_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _format_value(result, key):
+    if 'error' in result:
+        return '-'
+    return str(result[key])
+
+
+def build_report(results, compare_results=None):
+    lines = [
+        f"# 图表类型渲染性能（{results['commit']}）",
+        '',
+        f"{results['categories']}个种类 x {results['periods']}个时间段，每个图表类型渲染{results['frames']}帧，"
+        f"图标：{'否' if results['no_icons'] else '是'}。",
+        '',
+    ]
+    keys = [('prepare_s', '预处理(秒)'), ('fps', '帧/秒'), ('frame_p90_ms', 'p90帧耗时(毫秒)'), ('peak_rss_mb', '峰值内存(MB)')]
+    header = ['图表类型']
+    for _, title in keys:
+        header += [f"{title}（对比）", title] if compare_results else [title]
+    lines.append('| ' + ' | '.join(header) + ' |')
+    lines.append('| ' + ' | '.join(['---'] * len(header)) + ' |')
+    for chart_type_name, result in results['results'].items():
+        if 'error' in result:
+            lines.append(f"| {chart_type_name} | 失败：{result['error']} |")
+            continue
+        row = [chart_type_name]
+        for key, _ in keys:
+            if compare_results:
+                row.append(_format_value(compare_results['results'].get(chart_type_name, {'error': None}), key))
+            row.append(_format_value(result, key))
+        lines.append('| ' + ' | '.join(row) + ' |')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测试各个图表类型的预处理和渲染性能")
+    parser.add_argument('chart_types', nargs='*', default=CHART_TYPES)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--periods', type=int, default=30)
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--no-icons', action='store_true')
+    parser.add_argument('--output', default=None, help="保存结果的json文件")
+    parser.add_argument('--compare', default=None, help="其它版本保存的结果文件")
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--data-dir', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # 子进程中只输出一行json
+        print(json.dumps(run_chart_type(args.worker, args.data_dir, args.frames, not args.no_icons)))
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        make_dataset(data_dir, args.categories, args.periods)
+        results = {
+            'commit': _get_git_commit(),
+            'python': platform.python_version(),
+            'platform': f"{platform.system()} {platform.machine()}",
+            'categories': args.categories,
+            'periods': args.periods,
+            'frames': args.frames,
+            'no_icons': args.no_icons,
+            'results': {chart_type_name: run_in_subprocess(chart_type_name, data_dir, args) for chart_type_name in args.chart_types},
+        }
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4, ensure_ascii=False)
+    compare_results = None
+    if args.compare:
+        with open(args.compare) as file:
+            compare_results = json.load(file)
+    print(build_report(results, compare_results), end='')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""长表转宽表的耗时测试
+
+    python benchmarks/csv_pivot.py [--entities 300] [--years 250]
+
+生成ourworldindata格式的长表（Entity,Code,Year,value），比较逐个实体筛选的旧实现与
+CSVGenerator.pivot_entity_data的耗时，并检查两者的结果一致。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chart_constants import CSVSource, WORLD_AREAS_TO_DELETE
+from csv_generator import CSVGenerator
+
+
+def make_long_csv(path, entity_count, year_count, seed=0):
+    rng = np.random.default_rng(seed)
+    entities = [f"Entity {i}" for i in range(entity_count)] + WORLD_AREAS_TO_DELETE[:5]
+    years = np.arange(2020 - year_count + 1, 2021)
+    df = pd.DataFrame({
+        'Entity': np.repeat(entities, len(years)),
+        'Code': 'XXX',
+        'Year': np.tile(years, len(entities)),
+        'value': rng.random(len(entities) * len(years)) * 1000,
+    })
+    # 每个实体的时间段不同
+    df = df[rng.random(len(df)) > 0.1]
+    df.to_csv(path, index=False)
+
+
+# 修改之前的实现：每个实体筛选一次，逐列插入
+def legacy_pivot(df, entity_column_name, value_column_name, index_name="Time"):
+    year_list = sorted(df.index.unique().values)
+    entity_list = list(set(df[entity_column_name].unique()) - set(WORLD_AREAS_TO_DELETE))
+    new_df = pd.DataFrame({index_name: year_list})
+    for entity_name in entity_list:
+        entity_df = df[df[entity_column_name] == entity_name]
+        if entity_df.index.values.tolist() != year_list:
+            entity_df = entity_df.reindex(year_list, fill_value='')
+        new_df[entity_name] = entity_df[value_column_name].values
+    return new_df.set_index(index_name)
+
+
+def measure(func, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长表转宽表的耗时测试")
+    parser.add_argument('--entities', type=int, default=300)
+    parser.add_argument('--years', type=int, default=250)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_path = f"{temp_dir}/long.csv"
+        make_long_csv(csv_path, args.entities, args.years)
+        generator = CSVGenerator(csv_path, f"{temp_dir}/wide.csv", CSVSource.OUR_WORLD_IN_DATA)
+        df = pd.read_csv(csv_path, index_col='Year')
+
+        with warnings.catch_warnings():
+            # 旧实现会产生DataFrame碎片化的警告
+            warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+            legacy_time, legacy_df = measure(lambda: legacy_pivot(df, 'Entity', 'value'), args.repeat)
+        pivot_time, pivot_df = measure(lambda: generator.pivot_entity_data(df, 'Entity', 'value'), args.repeat)
+        handler_time, _ = measure(lambda: generator.handle_our_world_in_data(translate_country_name=False), args.repeat)
+
+    legacy_values = legacy_df[sorted(legacy_df.columns)].replace('', np.nan).astype(float)
+    is_same = np.allclose(legacy_values.values, pivot_df.values, equal_nan=True) and legacy_values.index.equals(pivot_df.index)
+
+    print(f"{args.entities}个实体 x {args.years}年，共{len(df)}行，取{args.repeat}次中的最小值")
+    print(f"逐个实体筛选（旧实现）：{legacy_time * 1000:.1f}毫秒")
+    print(f"pivot_entity_data：{pivot_time * 1000:.1f}毫秒")
+    print(f"handle_our_world_in_data（包括读取csv）：{handler_time * 1000:.1f}毫秒")
+    print(f"结果一致：{is_same}")
+
+
+if __name__ == "__main__":
+    main()
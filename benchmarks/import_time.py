@@ -0,0 +1,109 @@
+"""模块导入耗时测试
+
+    python benchmarks/import_time.py [--repeat 5] [--compare-dir 其它版本的目录] [--output 报告文件]
+
+每个模块在新的解释器中通过python -X importtime导入，取多次运行的中位数，
+同时列出耗时最多的直接依赖，用于发现导入耗时的回归。
+"""
+import argparse
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ['chart_constants', 'csv_util', 'csv_generator', 'data_video_generator', 'batch_render', 'gui']
+
+
+# 解析importtime的输出，返回[(层级, 模块名, 累计耗时微秒)]
+def parse_import_time(stderr):
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+    return entries
+
+
+def measure_module(module, repo_dir, repeat):
+    cumulative_times = []
+    wall_times = []
+    run_entries = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=repo_dir,
+                                capture_output=True, text=True)
+        wall_times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            return {'module': module, 'error': result.stderr.strip().splitlines()[-1]}
+        entries = parse_import_time(result.stderr)
+        run_entries.append(entries)
+        cumulative_times.append(next(t for depth, name, t in entries if depth == 0 and name == module))
+
+    # 使用中位数那一次运行的记录，直接依赖出现在模块自身的记录之前，层级为1
+    median_time = statistics.median_low(cumulative_times)
+    entries = run_entries[cumulative_times.index(median_time)]
+    module_entry_index = max(i for i, (depth, name, _) in enumerate(entries) if depth == 0 and name == module)
+    top_level_entries = [(name, t) for depth, name, t in entries[:module_entry_index] if depth == 1]
+    return {
+        'module': module,
+        'import_ms': median_time / 1000,
+        'process_ms': statistics.median(wall_times) * 1000,
+        'heaviest_imports': sorted(top_level_entries, key=lambda item: -item[1])[:3],
+    }
+
+
+def _format_result(result):
+    if 'error' in result:
+        return f"导入失败：{result['error']}", '-', '-'
+    heaviest_imports = ', '.join(f"{name} {t / 1000:.0f}" for name, t in result['heaviest_imports'])
+    return f"{result['import_ms']:.0f}", f"{result['process_ms']:.0f}", heaviest_imports
+
+
+def build_report(modules, repeat, compare_dir=None):
+    lines = [
+        '# 模块导入耗时',
+        '',
+        f"Python {platform.python_version()}，{platform.system()} {platform.machine()}，每个模块运行{repeat}次取中位数，单位：毫秒。",
+        '"进程"为启动新的解释器并导入该模块的总耗时。',
+        '',
+    ]
+    if compare_dir:
+        lines.append('| 模块 | 导入（对比目录） | 导入 | 进程（对比目录） | 进程 | 耗时最多的直接依赖 |')
+        lines.append('| --- | --- | --- | --- | --- | --- |')
+    else:
+        lines.append('| 模块 | 导入 | 进程 | 耗时最多的直接依赖 |')
+        lines.append('| --- | --- | --- | --- |')
+
+    for module in modules:
+        import_ms, process_ms, heaviest_imports = _format_result(measure_module(module, REPO_DIR, repeat))
+        if compare_dir:
+            compare_import_ms, compare_process_ms, _ = _format_result(measure_module(module, compare_dir, repeat))
+            lines.append(f"| {module} | {compare_import_ms} | {import_ms} | {compare_process_ms} | {process_ms} | {heaviest_imports} |")
+        else:
+            lines.append(f"| {module} | {import_ms} | {process_ms} | {heaviest_imports} |")
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测试各个模块的导入耗时")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--compare-dir', default=None, help="另一个版本的代码目录，例如git worktree")
+    parser.add_argument('--output', default=None, help="保存报告的文件，默认输出到stdout")
+    args = parser.parse_args()
+
+    report = build_report(args.modules, args.repeat, args.compare_dir)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report)
+    else:
+        print(report, end='')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""enable_retained_rendering与每一帧ax.clear()重建的画面对比
+
+    python benchmarks/retained_diff.py [--categories 30] [--periods 10] [--frames 40]
+
+使用chart_types.py中的随机数据和图标，每个配置分别关闭和打开enable_retained_rendering，
+在Agg backend上绘制均匀选取的--frames帧并逐像素比较，retained模式必须与重建的结果完全一致，有任何差异时返回1。
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from chart_types import init_matplotlib, create_generator, prepare_rendering, render_frame, get_sample_frames, make_dataset
+
+# (名称, 图表类型, 参数)，参数中的枚举使用名称
+CASES = [
+    ('H_BAR 网格+图标+数值变化', 'H_BAR', dict(is_show_grid=True, chart_category_icon_position='LEFT',
+                                         show_value_change_indicator=True)),
+    ('H_BAR 边框+右侧图标+数值变化', 'H_BAR', dict(is_show_grid=True, show_category_bbox=True,
+                                           chart_category_icon_position='RIGHT', show_value_change_indicator=True)),
+    ('H_BAR 左侧种类名称+无网格', 'H_BAR', dict(is_show_grid=False, category_label_position='LEFT',
+                                       chart_category_icon_position='LEFT', show_value_change_indicator=True)),
+    ('GRID 图标+数值变化', 'GRID', dict(chart_category_icon_position='LEFT', show_value_change_indicator=True)),
+    ('GRID_AND_BAR 数值变化', 'GRID_AND_BAR', dict(show_value_change_indicator=True)),
+]
+
+
+# 返回(比较的帧数, 有差异的帧数, 差异像素数量的最大值)
+def compare_case(chart_type_name, params, data_dir, frame_count):
+    import matplotlib.pyplot as plt
+    generators = [prepare_rendering(create_generator(chart_type_name, data_dir, enable_retained_rendering=retained, **params))
+                  for retained in [False, True]]
+    if generators[1].init_method is None:
+        raise RuntimeError(f"{chart_type_name}没有使用retained模式")
+    frame_numbers = get_sample_frames(generators[0], frame_count)
+    changed_pixel_counts = []
+    # 逐帧比较，不在内存中保留所有帧
+    for frame_number in frame_numbers:
+        rebuilt, retained = (render_frame(generator, frame_number) for generator in generators)
+        changed_pixel_counts.append(int(np.count_nonzero((rebuilt != retained).any(axis=2))))
+    plt.close('all')
+    return len(frame_numbers), sum(count > 0 for count in changed_pixel_counts), max(changed_pixel_counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较retained模式与每一帧重建的画面")
+    parser.add_argument('--categories', type=int, default=30)
+    parser.add_argument('--periods', type=int, default=10)
+    parser.add_argument('--frames', type=int, default=40)
+    args = parser.parse_args()
+
+    init_matplotlib()
+    failed = False
+    print('| 配置 | 比较的帧数 | 有差异的帧数 | 最多的差异像素 |')
+    print('| --- | --- | --- | --- |')
+    with tempfile.TemporaryDirectory() as data_dir:
+        make_dataset(data_dir, args.categories, args.periods)
+        for name, chart_type_name, params in CASES:
+            frame_count, changed_frame_count, max_changed_pixels = compare_case(chart_type_name, params, data_dir, args.frames)
+            failed = failed or changed_frame_count > 0
+            print(f"| {name} | {frame_count} | {changed_frame_count} | {max_changed_pixels} |")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
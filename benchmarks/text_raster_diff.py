@@ -0,0 +1,97 @@
+"""fast_text_rendering与普通文字绘制的画面差异和耗时对比
+
+    python benchmarks/text_raster_diff.py [H_BAR GRID ...] [--categories 30] [--periods 10] [--frames 40]
+                                          [--max-changed-ratio 0.05] [--max-strong-ratio 0.01] [--save-dir 目录]
+
+使用chart_types.py中的随机数据，同一个图表类型分别关闭和打开fast_text_rendering，在Agg backend上绘制相同的帧并逐像素比较。
+栅格化的文字锚点对齐到整数像素，而matplotlib按照1/64像素的位置绘制字形，所以文字边缘会有少量差异：
+changed为有任何差异的像素比例，strong为某个通道相差超过64的像素比例，超过阈值时返回1。
+--save-dir保存差异最大的一帧（normal.png、fast.png、diff.png），用于人工检查。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from chart_types import init_matplotlib, create_generator, prepare_rendering, render_frame, get_sample_frames, make_dataset
+
+# 折线图使用自己的文字artist，不受fast_text_rendering影响
+CHART_TYPES = ['H_BAR', 'GRID', 'GRID_AND_BAR']
+# 默认阈值：有任何差异的像素比例、某个通道相差超过64的像素比例
+MAX_CHANGED_RATIO = 0.05
+MAX_STRONG_RATIO = 0.01
+
+
+def render_frames(chart_type_name, data_dir, frame_count, fast_text_rendering):
+    import matplotlib.pyplot as plt
+    generator = prepare_rendering(create_generator(chart_type_name, data_dir, fast_text_rendering=fast_text_rendering))
+
+    elapsed = 0
+    for frame_number in get_sample_frames(generator, frame_count):
+        frame_start = time.perf_counter()
+        frame = render_frame(generator, frame_number)
+        elapsed += time.perf_counter() - frame_start
+        yield frame[:, :, :3], elapsed
+    plt.close('all')
+
+
+def compare_chart_type(chart_type_name, data_dir, frame_count, save_dir=None):
+    changed_ratios, strong_ratios = [], []
+    worst = None
+    normal_frames = render_frames(chart_type_name, data_dir, frame_count, False)
+    fast_frames = render_frames(chart_type_name, data_dir, frame_count, True)
+    # 逐帧比较，不在内存中保留所有帧
+    for (normal, normal_s), (fast, fast_s) in zip(normal_frames, fast_frames):
+        difference = np.abs(normal.astype(np.int16) - fast).max(axis=2)
+        changed_ratios.append(np.count_nonzero(difference) / difference.size)
+        strong_ratios.append(np.count_nonzero(difference > 64) / difference.size)
+        if worst is None or changed_ratios[-1] > worst[0]:
+            worst = (changed_ratios[-1], normal, fast, difference)
+
+    if save_dir and worst is not None:
+        import matplotlib.pyplot as plt
+        save_dir = f"{save_dir}/{chart_type_name}"
+        os.makedirs(save_dir, exist_ok=True)
+        plt.imsave(f"{save_dir}/normal.png", worst[1])
+        plt.imsave(f"{save_dir}/fast.png", worst[2])
+        plt.imsave(f"{save_dir}/diff.png", worst[3], cmap='gray_r', vmin=0, vmax=255)
+    return {
+        'normal_ms': normal_s / len(changed_ratios) * 1000,
+        'fast_ms': fast_s / len(changed_ratios) * 1000,
+        'changed_ratio': max(changed_ratios),
+        'strong_ratio': max(strong_ratios),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较fast_text_rendering与普通文字绘制的画面和耗时")
+    parser.add_argument('chart_types', nargs='*', default=CHART_TYPES)
+    parser.add_argument('--categories', type=int, default=30)
+    parser.add_argument('--periods', type=int, default=10)
+    parser.add_argument('--frames', type=int, default=40)
+    parser.add_argument('--max-changed-ratio', type=float, default=MAX_CHANGED_RATIO)
+    parser.add_argument('--max-strong-ratio', type=float, default=MAX_STRONG_RATIO)
+    parser.add_argument('--save-dir', default=None, help="保存差异最大的一帧")
+    args = parser.parse_args()
+
+    init_matplotlib()
+    failed = False
+    print('| 图表类型 | 普通(毫秒/帧) | 缓存(毫秒/帧) | 变化像素 | 明显变化像素 |')
+    print('| --- | --- | --- | --- | --- |')
+    with tempfile.TemporaryDirectory() as data_dir:
+        make_dataset(data_dir, args.categories, args.periods)
+        for chart_type_name in args.chart_types:
+            result = compare_chart_type(chart_type_name, data_dir, args.frames, args.save_dir)
+            passed = result['changed_ratio'] <= args.max_changed_ratio and result['strong_ratio'] <= args.max_strong_ratio
+            failed = failed or not passed
+            print(f"| {chart_type_name} | {result['normal_ms']:.1f} | {result['fast_ms']:.1f} | "
+                  f"{result['changed_ratio']:.2%} | {result['strong_ratio']:.2%}{'' if passed else ' 超出阈值'} |")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
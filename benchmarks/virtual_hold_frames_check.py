@@ -0,0 +1,76 @@
+"""virtual_hold_frames与普通存储的结果对比
+
+    python benchmarks/virtual_hold_frames_check.py [H_BAR GRID ...] [--categories 30] [--periods 10] [--frames 20]
+
+使用chart_types.py中的随机数据，同一个图表类型分别关闭和打开virtual_hold_frames：
+每一个视频帧的数字文字（FramePlan.number_labels，折线图为种类和最大最小值的文字）必须完全相同，
+另外均匀选取--frames帧在Agg backend上绘制并逐像素比较，文字或者画面有任何差异时返回1。
+折线图的定格帧不复制数据行，普通存储的线在开始处有重复的点，路径简化之后抗锯齿可能略有不同，因此只比较文字。
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from chart_types import init_matplotlib, create_generator, prepare_rendering, render_frame, get_sample_frames, make_dataset
+
+CHART_TYPES = ['H_BAR', 'GRID', 'GRID_AND_BAR', 'LINE_CHART']
+
+
+# 每一个视频帧显示的数字文字
+def get_number_labels(generator):
+    if generator.frame_plan is not None:
+        return [generator.frame_plan.number_labels[generator.frame_plan.get_frame_slice(row_index)].tolist()
+                for row_index in generator.frame_row_indices.tolist()]
+    labels = []
+    for row_index in generator.frame_row_indices.tolist():
+        generator.line_chart_update(row_index)
+        labels.append([artist.get_text() for artists in generator.line_artists for name, artist in artists.items()
+                       if name != 'line'])
+    return labels
+
+
+def compare_chart_type(chart_type_name, data_dir, frame_count):
+    import matplotlib.pyplot as plt
+    generators = [prepare_rendering(create_generator(chart_type_name, data_dir, first_frame_duration=500,
+                                                     show_max_and_min=chart_type_name == 'LINE_CHART',
+                                                     virtual_hold_frames=virtual))
+                  for virtual in [False, True]]
+    normal_labels, virtual_labels = (get_number_labels(generator) for generator in generators)
+    label_diff_count = sum(a != b for a, b in zip(normal_labels, virtual_labels)) + abs(len(normal_labels) - len(virtual_labels))
+
+    frame_numbers = get_sample_frames(generators[0], frame_count)
+    pixel_diff_count = 0
+    for frame_number in frame_numbers:
+        normal, virtual = (render_frame(generator, frame_number) for generator in generators)
+        pixel_diff_count += int(np.count_nonzero((normal != virtual).any(axis=2)))
+    plt.close('all')
+    return len(normal_labels), label_diff_count, pixel_diff_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较virtual_hold_frames与普通存储的数字文字和画面")
+    parser.add_argument('chart_types', nargs='*', default=CHART_TYPES)
+    parser.add_argument('--categories', type=int, default=30)
+    parser.add_argument('--periods', type=int, default=10)
+    parser.add_argument('--frames', type=int, default=20)
+    args = parser.parse_args()
+
+    init_matplotlib()
+    failed = False
+    print('| 图表类型 | 视频帧数 | 数字文字不同的帧 | 不同的像素 |')
+    print('| --- | --- | --- | --- |')
+    with tempfile.TemporaryDirectory() as data_dir:
+        make_dataset(data_dir, args.categories, args.periods)
+        for chart_type_name in args.chart_types:
+            frame_count, label_diff_count, pixel_diff_count = compare_chart_type(chart_type_name, data_dir, args.frames)
+            failed = failed or label_diff_count > 0 or (pixel_diff_count > 0 and chart_type_name != 'LINE_CHART')
+            print(f"| {chart_type_name} | {frame_count} | {label_diff_count} | {pixel_diff_count} |")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -46,6 +46,14 @@ class ChartType(Enum):
     LINE_CHART = 5
 
 
+@unique
+class VideoWriterType(Enum):
+    # matplotlib的MovieWriter，每一帧都调用savefig
+    MATPLOTLIB = 1
+    # 直接将figure的RGBA缓冲区写入ffmpeg的stdin
+    RAW_PIPE = 2
+
+
 @unique
 class ProvinceNameType(Enum):
     # 北京市 ==> 北京市
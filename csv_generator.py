@@ -1,9 +1,10 @@
 import pandas as pd
+import numpy as np
+import io
 import os
 from chart_constants import *
 from dataclasses import dataclass
 # from typing import Callable
-from csv_util import delete_rows
 
 
 @dataclass
@@ -13,18 +14,33 @@ class CSVGenerator:
     csv_source: CSVSource
     columns_to_keep: [str] = None
     index_name: str = "Time"
-
-    # 行列互换
-    def transpose_csv(self, csv_path, save_path, column_to_rename="Unnamed: 0"):
-        data = pd.read_csv(csv_path)
-        data.rename(columns={column_to_rename: self.index_name}, inplace=True)
-        data.set_index(self.index_name, inplace=True)
-        data = data.transpose()
-        data.to_csv(save_path)
-
-        data = pd.read_csv(save_path)
-        data.rename(columns={"Unnamed: 0": self.index_name}, inplace=True)
-        data.to_csv(save_path, index=False)
+    # 分块读取长表格式的原始数据时每一块的行数，为空时一次性读取整个文件
+    # 分块读取时只保留需要的行和列，峰值内存由每一块的大小决定，而不是由整个文件的大小决定
+    read_chunk_size: int = None
+    # 分块读取时数值使用的类型
+    chunk_value_dtype: str = 'float32'
+
+    # 行列互换，第一列（或者column_to_rename列）的值作为新的列名，原来的列名作为新的时间索引
+    def transpose_data(self, df, column_to_rename=None):
+        if column_to_rename is not None:
+            df = df.set_index(column_to_rename)
+        df = df.transpose()
+        df.index.name = self.index_name
+        df.columns.name = None
+        return df
+
+    # 与保存为csv之后再读取的结果一致：数值列转换为数值类型，年份转换为整数
+    @staticmethod
+    def infer_types(df):
+        def to_numeric_if_possible(values):
+            try:
+                return pd.to_numeric(values)
+            except (ValueError, TypeError):
+                return values
+
+        df = df.apply(to_numeric_if_possible)
+        df.index = to_numeric_if_possible(df.index)
+        return df
 
     # 表格中实际涉及到的种类名称
     def find_total_categories(self, top_n):
@@ -53,18 +69,20 @@ class CSVGenerator:
 
         return total
     
-    def delete_data(self, csv_path, column_name_list=None, row_name_list=None):
-        df = pd.read_csv(csv_path, index_col=self.index_name)
+    @staticmethod
+    def delete_data(df, column_name_list=None, row_name_list=None):
         if column_name_list:
-            df.drop(column_name_list, axis=1, inplace=True, errors="ignore")
+            df = df.drop(column_name_list, axis=1, errors="ignore")
         if row_name_list:
-            df.drop(row_name_list, inplace=True, errors="ignore")
-        df.to_csv(csv_path)
+            df = df.drop(row_name_list, errors="ignore")
+        return df
+
+    @staticmethod
+    def rename_data(df, column_name_dict):
+        return df.rename(columns=column_name_dict)
 
-    def rename_data(self, csv_path, column_name_dict):
-        df = pd.read_csv(csv_path, index_col=self.index_name)
-        df.rename(columns=column_name_dict, inplace=True)
-        df.to_csv(csv_path)
+    def save_data(self, df):
+        df.to_csv(self.real_csv_path)
 
     # 数据处理，例如处理数据空值，合并行列等
     def process(self, process_period, process_func, is_saving=True, is_index=True):
@@ -86,36 +104,45 @@ class CSVGenerator:
         if is_saving:
             df.to_csv(self.real_csv_path, index=is_index)
 
-    # 初步的数据预处理
-    def generate(self, *args, **kwargs):
+    # 初步的数据预处理，原始数据只读取一次，所有处理（包括post_process_func）都在内存中完成，最后只写入一次
+    def generate(self, *args, post_process_func=None, **kwargs):
         if self.csv_source is CSVSource.NO_NEED_PREPROCESS:
+            if post_process_func:
+                self.process("post", post_process_func)
             return
         # if os.path.exists(self.real_csv_path) and input(f"{self.real_csv_path}已经存在，是否继续？(y/n)") == "n":
         #     return
         if self.csv_source is CSVSource.WORLD_BANK:
-            self.handle_world_bank_data(*args, **kwargs)
+            df = self.handle_world_bank_data(*args, **kwargs)
         elif self.csv_source is CSVSource.OUR_WORLD_IN_DATA:
-            self.handle_our_world_in_data(*args, **kwargs)
+            df = self.handle_our_world_in_data(*args, **kwargs)
         elif self.csv_source is CSVSource.STATS_GOV:
-            self.handle_stats_gov_data(*args, **kwargs)
+            df = self.handle_stats_gov_data(*args, **kwargs)
         elif self.csv_source is CSVSource.BGS_MINERALS:
-            self.handle_bgs_minerals_data(*args, **kwargs)
+            df = self.handle_bgs_minerals_data(*args, **kwargs)
         elif self.csv_source is CSVSource.UN_DATA:
-            self.handle_un_data(*args, **kwargs)
+            df = self.handle_un_data(*args, **kwargs)
         else:
             print('文件来源有误')
+            return
+
+        if post_process_func:
+            df = post_process_func(self.infer_types(df))
+        self.save_data(df)
 
     # world bank数据预处理
     # 一开始需要手动处理一下！为了进行数据勘误
     def handle_world_bank_data(self, *args, **kwargs):
-        self.transpose_csv(self.original_csv_path, self.real_csv_path, 'Country Name')
+        df = self.transpose_data(pd.read_csv(self.original_csv_path), 'Country Name')
         if self.columns_to_keep is None:
             columns_to_delete = WORLD_BANK_COLUMNS_TO_DELETE
         else:
             columns_to_delete = list(set(WORLD_BANK_COLUMNS_TO_DELETE) - set(self.columns_to_keep))
-        self.delete_data(self.real_csv_path, column_name_list=columns_to_delete,
-                         row_name_list=WORLD_BANK_ROWS_TO_DELETE)
-        self.rename_data(self.real_csv_path, column_name_dict=COUNTRY_NAME_MAPS)
+        # 每一行末尾的逗号会产生一个Unnamed列，列的位置与年份范围有关
+        unnamed_rows = [row for row in df.index if str(row).startswith('Unnamed')]
+        df = self.delete_data(df, column_name_list=columns_to_delete,
+                              row_name_list=WORLD_BANK_ROWS_TO_DELETE + unnamed_rows)
+        return self.rename_data(df, column_name_dict=COUNTRY_NAME_MAPS)
 
     # BGS数据处理
     def handle_bgs_minerals_data(self, *args, **kwargs):
@@ -123,10 +150,8 @@ class CSVGenerator:
         for file in sorted(os.listdir(self.original_csv_path)):
             df_list.append(pd.read_csv(f"{self.original_csv_path}/{file}", index_col=0))
         df = pd.concat(df_list, axis=1)
-        df.to_csv(self.real_csv_path)
-        data = pd.read_csv(self.real_csv_path)
-        print(data.columns)
-        self.transpose_csv(self.real_csv_path, self.real_csv_path)
+        print(df.columns)
+        return self.transpose_data(df)
 
     # 国家统计局数据预处理
     def handle_stats_gov_data(self, *args, **kwargs):
@@ -135,29 +160,77 @@ class CSVGenerator:
         i = -1
         while lines[i][:4] not in ['新疆维吾', '乌鲁木齐']:
             i -= 1
-        tail_rows = (-i) - 1
 
-        delete_rows(
-            self.original_csv_path, self.real_csv_path, head_rows_num=3,
-            tail_rows_num=tail_rows, source_encode='gbk'
-        )
-        self.transpose_csv(self.real_csv_path, self.real_csv_path, '地区')
+        # 删除开头的3行说明和最后一个地区之后的注释
+        df = pd.read_csv(io.StringIO(''.join(lines[3:len(lines) + i + 1])))
+        df = self.transpose_data(df, '地区')
 
-        df = pd.read_csv(self.real_csv_path)
         # 2019年 => 2019
-        time_values = df[self.index_name].values
-        time_values = list(map(lambda v: int(v[:-1]), time_values))
-        df[self.index_name] = time_values
+        df.index = [int(v[:-1]) for v in df.index]
+        df.index.name = self.index_name
         # reverse
         df = df.iloc[::-1]
 
-        if 'year_list' in kwargs:
-            year_list = kwargs['year_list']
-            df.set_index(self.index_name, inplace=True)
-            df = df.reindex(year_list)
-            df.to_csv(self.real_csv_path, index=True)
-        else:
-            df.to_csv(self.real_csv_path, index=False)
+        if kwargs.get('year_list') is not None:
+            df = df.reindex(kwargs['year_list'])
+        return df
+
+    # 原始csv中除去索引列和需要删除的列之后的列名，用于将列的下标转换为列名
+    @staticmethod
+    def read_csv_columns(csv_path, index_column, columns_to_drop=()):
+        columns = pd.read_csv(csv_path, nrows=0).columns
+        return [column for column in columns if column != index_column and column not in columns_to_drop]
+
+    # 读取长表中的年份、实体和数值三列，返回以年份为索引的DataFrame
+    # 分块读取时，每一块都先删除WORLD_AREAS_TO_DELETE和year_list以外的行，实体使用category类型，年份使用int16
+    def read_long_data(self, csv_path, year_column_name, entity_column_name, value_column_name, year_list=None):
+        usecols = [year_column_name, entity_column_name, value_column_name]
+        if not self.read_chunk_size:
+            return pd.read_csv(csv_path, usecols=usecols, index_col=year_column_name)
+
+        year_chunks, entity_chunks, value_chunks = [], [], []
+        reader = pd.read_csv(csv_path, usecols=usecols, dtype={entity_column_name: str}, chunksize=self.read_chunk_size)
+        for chunk in reader:
+            # 年份列中可能有注释等非数字内容
+            years = pd.to_numeric(chunk[year_column_name], errors='coerce')
+            row_filter = years.notna() & ~chunk[entity_column_name].isin(WORLD_AREAS_TO_DELETE)
+            if year_list is not None:
+                row_filter &= years.isin(year_list)
+            year_chunks.append(years[row_filter].to_numpy(dtype=np.int16))
+            entity_chunks.append(chunk.loc[row_filter, entity_column_name].astype('category'))
+            value_chunks.append(pd.to_numeric(chunk.loc[row_filter, value_column_name], errors='coerce')
+                                .to_numpy(dtype=self.chunk_value_dtype))
+
+        return pd.DataFrame({
+            entity_column_name: pd.api.types.union_categoricals(entity_chunks, sort_categories=True),
+            value_column_name: np.concatenate(value_chunks),
+        }, index=pd.Index(np.concatenate(year_chunks), name=year_column_name))
+
+    # 长表转换为宽表：df的索引为年份，每一行为某个实体某一年的数据
+    # 转换之后每一列为一个实体（按名称排序），每一行为year_list中的一年，缺少的数据为空值
+    # 同一个实体同一年有多行数据时，使用最后一行
+    def pivot_entity_data(self, df, entity_column_name, value_column_name, year_list=None):
+        # 例如有的国家数据时间段是从1990~2000，而有的国家数据则是从1960~2000，太阳能发电量数据就是如此
+        if year_list is None:
+            year_list = sorted(df.index.unique().values)
+
+        values = df[value_column_name]
+        long_df = pd.DataFrame({
+            self.index_name: df.index.values,
+            'entity': df[entity_column_name].values,
+            'value': values.values,
+        })
+        long_df = long_df[~long_df['entity'].isin(WORLD_AREAS_TO_DELETE)]
+        long_df = long_df.drop_duplicates([self.index_name, 'entity'], keep='last')
+
+        new_df = long_df.set_index([self.index_name, 'entity'])['value'].unstack('entity').reindex(year_list)
+        new_df.index.name = self.index_name
+        # 实体为category类型时，列也是CategoricalIndex
+        new_df.columns = new_df.columns.tolist()
+        # 缺少数据时整数会被转换为浮点数，使用可以为空的整数类型，保存的csv中仍然是整数
+        if pd.api.types.is_integer_dtype(values.dtype):
+            new_df = new_df.astype('Int64')
+        return new_df
 
     # ourworldindata.org的数据预处理
     # 注意，处理好了之后还需要翻译
@@ -169,67 +242,46 @@ class CSVGenerator:
         # 1996,0.1,0.2,...
         # 1997,06,0.9,...
         if country_name is not None:
-            df = pd.read_csv(self.original_csv_path)
-            df = df[df['Entity'] == country_name]
+            if self.read_chunk_size:
+                chunks = []
+                for chunk in pd.read_csv(self.original_csv_path, chunksize=self.read_chunk_size):
+                    chunk = chunk[chunk['Entity'] == country_name]
+                    value_columns = chunk.select_dtypes('number').columns.drop('Year', errors="ignore")
+                    chunks.append(chunk.astype({column: self.chunk_value_dtype for column in value_columns}))
+                df = pd.concat(chunks)
+            else:
+                df = pd.read_csv(self.original_csv_path)
+                df = df[df['Entity'] == country_name]
             df.drop(['Entity', 'Code'], axis=1, inplace=True, errors="ignore")
             df.rename(columns={'Year': self.index_name}, inplace=True)
             df.fillna(value=0, inplace=True)
-            df.to_csv(self.real_csv_path, index=False)
+            return df.set_index(self.index_name)
         # 表示选中所有的country或者说是entity
         # Time,country1,country2,...
         # 1996,0.1,0.2,...
         # 1997,06,0.9,...
         elif category_name is not None:
-            df = pd.read_csv(self.original_csv_path, index_col='Year')
             # column下标
             if isinstance(category_name, int):
-                category_name = df.columns[category_name]
-
-            # 例如有的国家数据时间段是从1990~2000，而有的国家数据则是从1960~2000，太阳能发电量数据就是如此
-            if year_list is None:
-                year_list = sorted(df.index.unique().values)
-            entity_list = list(set(df['Entity'].unique()) - set(WORLD_AREAS_TO_DELETE))
-
-            new_df = pd.DataFrame({self.index_name: year_list})
-
-            for entity_name in entity_list:
-                entity_df = df[df['Entity'] == entity_name]
-                # 如果这个国家的year index和指定的year index一致，就不需要reindex了！
-                if entity_df.index.values.tolist() != year_list:
-                    # reindex相当于只截取特定的时间段，如果时间段不存在则用0填充空数据，如果时间段已存在数据不变化
-                    entity_df = entity_df.reindex(year_list, fill_value='')
-                new_df[entity_name] = entity_df[category_name].values
+                category_name = self.read_csv_columns(self.original_csv_path, 'Year')[category_name]
 
+            df = self.read_long_data(self.original_csv_path, 'Year', 'Entity', category_name, year_list)
+            new_df = self.pivot_entity_data(df, 'Entity', category_name, year_list)
             if translate_country_name:
                 new_df.rename(columns=COUNTRY_NAME_ENGLISH_TO_CHINESE, inplace=True)
-            new_df.to_csv(self.real_csv_path, index=False)
+            return new_df
 
     # http://data.un.org/Explorer.aspx
     def handle_un_data(self, value_column_name=-1, entity_column_name=0, index_column="Year", translate_country_name=True, year_list=None, **kwargs):
-        df = pd.read_csv(self.original_csv_path, index_col=index_column)
-        df.drop(['fnSeqID', '1'], axis=1, inplace=True, errors="ignore")
-
         # column下标
+        columns = self.read_csv_columns(self.original_csv_path, index_column, ['fnSeqID', '1'])
         if isinstance(value_column_name, int):
-            value_column_name = df.columns[value_column_name]
+            value_column_name = columns[value_column_name]
         if isinstance(entity_column_name, int):
-            entity_column_name = df.columns[entity_column_name]
-
-        # 例如有的国家数据时间段是从1990~2000，而有的国家数据则是从1960~2000，太阳能发电量数据就是如此
-        if year_list is None:
-            year_list = sorted(df.index.unique().values)
-        entity_list = list(set(df[entity_column_name].unique()) - set(WORLD_AREAS_TO_DELETE))
-
-        new_df = pd.DataFrame({self.index_name: year_list})
-
-        for entity_name in entity_list:
-            entity_df = df[df[entity_column_name] == entity_name]
-            # 如果这个国家的year index和指定的year index一致，就不需要reindex了！
-            if entity_df.index.values.tolist() != year_list:
-                # reindex相当于只截取特定的时间段，如果时间段不存在则用空值填充空数据，如果时间段已存在数据不变化
-                entity_df = entity_df.reindex(year_list, fill_value='')
-            new_df[entity_name] = entity_df[value_column_name].values
+            entity_column_name = columns[entity_column_name]
 
+        df = self.read_long_data(self.original_csv_path, index_column, entity_column_name, value_column_name, year_list)
+        new_df = self.pivot_entity_data(df, entity_column_name, value_column_name, year_list)
         if translate_country_name:
             new_df.rename(columns=COUNTRY_NAME_ENGLISH_TO_CHINESE, inplace=True)
-        new_df.to_csv(self.real_csv_path, index=False)
+        return new_df
@@ -1,18 +1,7 @@
 import pandas as pd
-import time
 from chart_constants import COUNTRY_NAME_ENGLISH_TO_CHINESE, ProvinceNameType, PROVINCE_NAME_ABBR_MAPS, PROVINCE_NAME_SINGLE_WORD_MAPS
 
 
-# 删除首尾特定的几行
-def delete_rows(source_file, save_file, head_rows_num=0, tail_rows_num=0, source_encode='utf-8'):
-    with open(source_file, encoding=source_encode) as f:
-        lines = f.readlines()
-    lines = lines[head_rows_num:-tail_rows_num]
-    with open(save_file, 'w') as f:
-        f.writelines(lines)
-    time.sleep(1)
-
-
 # 处理苏联数据
 def handle_ussr_data(df_arg):
     df_columns = set(df_arg.columns.values)
@@ -125,10 +114,15 @@ def remove_china_sar_data(df):
 
 # 合并联合国粮农组织的最新数据
 # http://www.fao.org/faostat/en/?#data
-def merge_fao_data(df, fao_file_path):
-    fao_df = pd.read_csv(fao_file_path)
-
-    data_dict = dict(zip(fao_df['Area'].values, fao_df['Value'].values))
+# chunk_size不为空时分块读取，只保留Area和Value两列，用于很大的批量导出文件
+def merge_fao_data(df, fao_file_path, chunk_size=None):
+    data_dict = dict()
+    if chunk_size:
+        for chunk in pd.read_csv(fao_file_path, usecols=['Area', 'Value'], chunksize=chunk_size):
+            data_dict.update(zip(chunk['Area'].values, chunk['Value'].values))
+    else:
+        fao_df = pd.read_csv(fao_file_path, usecols=['Area', 'Value'])
+        data_dict.update(zip(fao_df['Area'].values, fao_df['Value'].values))
     data_dict[df.index.name] = df.index[-1]
 
     fao_df = pd.DataFrame([data_dict]).set_index(df.index.name)
@@ -1,27 +1,72 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
-from matplotlib.patches import Rectangle
-from matplotlib.dates import DateFormatter, MonthLocator, date2num
-import matplotlib.animation as animation
-from chart_constants import COUNTRY_COLORS, GENERIC_COLORS, ChartCategoryIconPosition, BarColorType, StatisticsTime, ChartType, CategoryLabelPosition
-from matplotlib.offsetbox import OffsetImage, AnnotationBbox
+import matplotlib
+# 只输出图片和视频，不需要交互式backend，导入pyplot时也不再探测可用的gui框架
+matplotlib.use('Agg')
+from chart_constants import COUNTRY_COLORS, GENERIC_COLORS, ChartCategoryIconPosition, BarColorType, StatisticsTime, ChartType, CategoryLabelPosition, VideoWriterType
+from video_writer import RawVideoPipeWriter
+from frame_plan import FramePlan
+from frame_source import FrameSource, RankTransitionSmoother
+from line_decimator import LineDecimator
+from image_cache import read_image, read_resized_image
+from render_profiler import RenderProfiler
+from prepared_data_cache import get_cache_key, get_file_hash, save_prepared_data, load_prepared_data
 import time
 import os
 import math
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from contextlib import contextmanager
 import numpy as np
 from typing import Callable
+from enum import Enum
 import random
-import configparser
+import copy
+import hashlib
+import shutil
+import subprocess
 
 
 # macOS系统上的中文处理
-plt.rcParams['axes.unicode_minus'] = False
+matplotlib.rcParams['axes.unicode_minus'] = False
 # 需要修改~/.matplotlib/fontlist-v330.json
-plt.rcParams['font.family'] = 'sans-serif'
-plt.rcParams['font.sans-serif'] = ['STHeiti Medium']
-# plt.rcParams['figure.constrained_layout.use'] = True
+matplotlib.rcParams['font.family'] = 'sans-serif'
+matplotlib.rcParams['font.sans-serif'] = ['STHeiti Medium']
+# matplotlib.rcParams['figure.constrained_layout.use'] = True
+
+# enable_profiling时写入output_dir的报告
+PROFILE_REPORT_FILE_NAME = "性能分析.json"
+
+# 会影响渲染结果的模块，增量渲染时任何一个文件修改之后所有片段都需要重新渲染
+RENDERING_MODULE_FILES = [
+    'data_video_generator.py', 'chart_constants.py', 'frame_plan.py', 'frame_source.py', 'line_decimator.py',
+    'image_cache.py', 'text_raster_cache.py', 'video_writer.py', 'prepared_data_cache.py',
+]
+
+
+# pandas和pyplot等渲染需要的模块在第一次创建（或者在子进程中反序列化）DataVideoGenerator时才导入，
+# 只读取参数的进程（例如batch_render解析配置、gui启动）不需要导入
+def _import_rendering_modules():
+    global pd, plt, Rectangle, DateFormatter, MonthLocator, date2num, OffsetImage, AnnotationBbox, \
+        TextRasterCache, RasterText
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Rectangle
+    from matplotlib.dates import DateFormatter, MonthLocator, date2num
+    from matplotlib.offsetbox import OffsetImage, AnnotationBbox
+    from text_raster_cache import TextRasterCache, RasterText
+
+
+# 每个进程中已经加载过的字体
+_warmed_up_font_names = set()
+
+
+# 查找并解析字体文件（中文字体文件很大），fork出的渲染进程可以直接使用已加载的字体
+def warm_up_fonts(font_names):
+    from matplotlib import font_manager
+    for font_name in font_names:
+        if not font_name or font_name in _warmed_up_font_names:
+            continue
+        _warmed_up_font_names.add(font_name)
+        font_path = font_manager.findfont(font_manager.FontProperties(family=font_name))
+        font_manager.get_font(font_path)
 
 
 @dataclass
@@ -109,6 +154,10 @@ class DataVideoGenerator:
     bar_alpha: float = 0.85
     show_value_change_indicator: bool = True
     change_indicator_x_offset: int = 10
+    # 与之后第几帧的数值比较，大于1时可以忽略插值过程中的短暂波动
+    change_indicator_look_ahead: int = 1
+    # 数值变化的绝对值不超过该值时显示为不变，避免箭头闪烁
+    change_indicator_dead_band: float = 0
     default_change_indicator: str = u'\u2501'
     default_change_indicator_color: str = "#fdb827"
     arrow_indicator_font_size: str = 30
@@ -140,18 +189,86 @@ class DataVideoGenerator:
     max_min_area_first_x2_position: float = 0.9
     max_min_area_first_y2_position: float = 0.75
     line_width: float = 2
+    # 折线图：按横轴的像素宽度对历史数据降采样，保留每个像素内的最大值和最小值
+    decimate_line_chart: bool = False
+    # H_BAR、GRID和GRID_AND_BAR：只创建一次artist，每一帧仅更新位置、宽度和文字，避免每一帧ax.clear()后重建
+    enable_retained_rendering: bool = False
+    # 并行渲染的进程数量，大于1时将帧分段，由多个进程分别渲染，最后通过ffmpeg无损拼接
+    render_process_count: int = 1
+    video_writer_type: VideoWriterType = VideoWriterType.MATPLOTLIB
+    # 以下参数仅用于VideoWriterType.RAW_PIPE
+    video_encoder_preset: str = 'medium'
+    video_crf: int = 23
+    video_pixel_format: str = 'yuv420p'
+    # 将帧布局数据保存到output_dir中，数据和参数不变时再次渲染可以直接加载
+    cache_frame_plan: bool = False
+    # 预先将种类icon缩放到视频中的显示大小，渲染时不再缩放
+    presample_category_icons: bool = False
+    # 缩放之后的icon的磁盘缓存目录，多个任务共享
+    icon_cache_dir: str = "~/.cache/bcr-generator/icons"
+    # 将插值、排名和数值变化等预处理结果缓存到磁盘，csv内容和相关参数不变时直接加载
+    cache_prepared_data: bool = False
+    prepared_data_cache_dir: str = "~/.cache/bcr-generator/prepared"
+    # 开始和结束的定格帧不复制数据行，由frame_row_indices指向相邻的数据行（开始保留1行，结束保留两次排名过渡的行数）
+    # 同时排名保存为float32、非日期的时间索引保存为category；数值仍然使用float64，数字文字与普通模式完全相同
+    virtual_hold_frames: bool = False
+    # 预览时只计算需要渲染的帧的插值和排名，不展开整个表格
+    lazy_preview_frames: bool = False
+    # 将视频分成固定帧数的片段保存在output_dir中，再次渲染时只渲染输入数据或参数变化了的片段
+    incremental_render: bool = False
+    incremental_segment_frame_count: int = 250
+    # 种类名称、数字和时间的文字栅格化之后缓存为图片，相同的文字不再重复排版，位置可能相差不到1像素
+    fast_text_rendering: bool = False
+    # 数字和时间等文字图片的缓存数量，超出时淘汰最久未使用的
+    text_raster_cache_size: int = 2048
+    # 背景图片和排名背景等不随帧变化的内容只绘制一次：排名背景在内存中生成，不再保存为排名背景.png，
+    # VideoWriterType.RAW_PIPE每一帧恢复静态图层之后只绘制坐标轴中的内容
+    composite_static_layer: bool = False
+    # 记录预处理各阶段和每一帧的耗时，渲染结束之后保存到output_dir中的性能分析.json
+    enable_profiling: bool = False
+    # 使用cProfile分析的帧数量，在所有帧中均匀选取
+    profile_sample_frame_count: int = 0
 
     def __post_init__(self):
+        _import_rendering_modules()
+        self.profiler = RenderProfiler(self.profile_sample_frame_count)
+        self.text_raster_cache = TextRasterCache(self.text_raster_cache_size) if self.fast_text_rendering else None
+        self.rank_background_image = None
         self._adjust_time_duration_params()
-        self._prepare_data_frame()
+        self.csv_fill_steps = math.ceil(self.period_duration / self.frame_interval)
+        self.rank_transition_steps = math.ceil(self.rank_transition_duration / self.frame_interval)
+
+        # 只计算部分帧时由_prepare_preview_frames设置
+        self.category_min_ranks = None
+        self.time_limits = None
+        # 需要在_prepare_data_frame修改chart_top_n之前计算
+        prepared_data_key = self._get_prepared_data_key() if self.cache_prepared_data else None
+        # 缓存中已经有所有帧的数据（内存映射）时，预览也直接使用缓存
+        is_prepared_data_loaded = bool(prepared_data_key) and self._load_prepared_data(prepared_data_key)
+        if not is_prepared_data_loaded and self.is_preview_mode and self.lazy_preview_frames:
+            with self.profiler.phase('preview_frames'):
+                self._prepare_preview_frames()
+        elif not is_prepared_data_loaded:
+            self._prepare_data_frame()
+            if self.show_value_change_indicator:
+                with self.profiler.phase('value_changed'):
+                    self._prepare_value_changed()
+            if self.virtual_hold_frames:
+                self._compact_data_frames()
+            if prepared_data_key:
+                with self.profiler.phase('prepared_data_cache'):
+                    self._save_prepared_data(prepared_data_key)
+
+        self._report_memory_usage()
+
+        # get_total_top_categories的结果只取决于排名数据，按照top_n缓存
+        self.total_top_categories_cache = {}
+        if self.summary_category and self.summary_category_display_name is None:
+            self.summary_category_display_name = self.summary_category
+        self.fig, self.ax = plt.subplots(figsize=self.video_aspect_ratio, dpi=self.video_dpi)
 
         # 数值上升下降图标显示
         if self.show_value_change_indicator:
-            shifted_df_filled = self.df_filled.shift(-1)
-            self.df_value_changed = shifted_df_filled - self.df_filled
-            self.df_value_changed.iloc[-1] = [0] * len(self.df_value_changed.columns)
-            self.df_value_changed[self.df_value_changed > 0] = 1
-            self.df_value_changed[self.df_value_changed < 0] = -1
             self.change_indicator_symbols = [self.default_change_indicator, u'\u2191', u'\u2193']
             self.change_indicator_colors = [self.default_change_indicator_color, "#ef4f4f", "#00917c"]
 
@@ -163,18 +280,31 @@ class DataVideoGenerator:
         else:
             self.video_save_path = f"{self.output_dir}/表格.mp4"
 
+        # 需要在第一帧之前创建artist的chart type
+        self.init_method = None
         if self.chart_type is ChartType.H_BAR:
-            if self.show_value_change_indicator:
+            if self.enable_retained_rendering:
+                self.update_method = self.h_bar_chart_retained_update
+                self.init_method = self._init_h_bar_artists
+            elif self.show_value_change_indicator:
                 self.update_method = self.h_bar_chart_with_change_indicator_update
             else:
                 self.update_method = self.h_bar_chart_update
         elif self.chart_type is ChartType.V_BAR:
             self.update_method = self.v_bar_chart_update
         elif self.chart_type is ChartType.GRID:
-            self.update_method = self.grid_chart_update
+            if self.enable_retained_rendering:
+                self.update_method = self.grid_chart_retained_update
+                self.init_method = self._init_grid_chart_artists
+            else:
+                self.update_method = self.grid_chart_update
             self.max_xlim = self.chart_top_n / self.rows_in_column
         elif self.chart_type is ChartType.GRID_AND_BAR:
-            self.update_method = self.grid_and_bar_chart_update
+            if self.enable_retained_rendering:
+                self.update_method = self.grid_chart_retained_update
+                self.init_method = self._init_grid_chart_artists
+            else:
+                self.update_method = self.grid_and_bar_chart_update
             total_columns = math.ceil(self.chart_top_n / self.rows_in_column)
             self.max_xlim = total_columns + self.grid_last_column_width
             self.grid_column_x_position_list = [0]
@@ -186,14 +316,12 @@ class DataVideoGenerator:
                 self.grid_column_x_position_list.append(self.grid_second_column_x_position)
         elif self.chart_type is ChartType.LINE_CHART:
             self.update_method = self.line_chart_update
-            self.max_xlim = self.df_filled.index[-1]
-            self.min_xlim = self.df_filled.index[0]
-            if self.show_max_and_min:
-                self.category_min_max_dict = dict()
-                for category in self.df_filled.columns:
-                    self.category_min_max_dict[category] = [10 ** 9, -10 ** 9]
+            self.init_method = self._init_line_chart_artists
+            self.min_xlim, self.max_xlim = self.time_limits or (self.df_filled.index[0], self.df_filled.index[-1])
+            self._prepare_line_chart_data()
 
-        self._adjust_bar_color_params()
+        with self.profiler.phase('colors'):
+            self._adjust_bar_color_params()
         self._adjust_offset_params()
         self._adjust_chart_pad_params()
         self._adjust_video_save_params()
@@ -201,15 +329,18 @@ class DataVideoGenerator:
         self._adjust_font_size_params()
 
         if self.show_champion_images:
-            self.champion_images = {}
-            for file in os.listdir(self.champion_images_dir):
-                if not file.startswith("."):
-                    self.champion_images[file.split('.')[0]] = plt.imread(f"{self.champion_images_dir}/{file}")
-            # 获取每一行最小值的列名字
-            self.df_champion_categories = self.df_rank_filled.idxmin(axis=1)
+            with self.profiler.phase('champion_images'):
+                self.champion_images = {}
+                self.champion_offset_images = {}
+                for file in os.listdir(self.champion_images_dir):
+                    if not file.startswith("."):
+                        self.champion_images[file.split('.')[0]] = read_image(f"{self.champion_images_dir}/{file}")
+                # 获取每一行最小值的列名字
+                self.df_champion_categories = self.df_rank_filled.idxmin(axis=1)
 
         if self.chart_type is ChartType.GRID_AND_BAR:
-            self.normalized_numbers_of_first_column = self.get_normalized_number_values_of_first_column()
+            with self.profiler.phase('normalized_bars'):
+                self.normalized_numbers_of_first_column = self.get_normalized_number_values_of_first_column()
 
         if self.chart_category_color is None:
             self.chart_category_color = self.chart_number_color
@@ -220,10 +351,12 @@ class DataVideoGenerator:
 
         self._validate_params()
 
-    def _prepare_data_frame(self):
-        self.csv_fill_steps = math.ceil(self.period_duration / self.frame_interval)
-        self.rank_transition_steps = math.ceil(self.rank_transition_duration / self.frame_interval)
+    # spawn启动的子进程（并行渲染、gui中的VideoGeneratorProcess）只反序列化对象，不会执行__post_init__
+    def __setstate__(self, state):
+        _import_rendering_modules()
+        self.__dict__.update(state)
 
+    def _read_data_frame(self):
         if self.chart_type is ChartType.LINE_CHART:
             data_frame = pd.read_csv(self.csv_path, index_col=self.index_col, parse_dates=[self.index_col])
         else:
@@ -243,45 +376,237 @@ class DataVideoGenerator:
 
         if self.chart_top_n is None:
             self.chart_top_n = data_frame.shape[1]
+        return data_frame
 
+    def _prepare_data_frame(self):
+        with self.profiler.phase('csv_load'):
+            data_frame = self._read_data_frame()
         if self.summary_category:
             expended_category_df = self.fill_csv(data_frame[self.summary_category], with_rank=False)
             self.summary_category_values = expended_category_df[self.summary_category].values
             data_frame.drop([self.summary_category], axis=1, inplace=True)
 
-            if self.summary_category_display_name is None:
-                self.summary_category_display_name = self.summary_category
-
         self.df_filled, self.df_rank_filled = self.fill_csv(data_frame)
-        self.fig, self.ax = plt.subplots(figsize=self.video_aspect_ratio, dpi=self.video_dpi)
+        self.frame_row_indices = self._get_frame_row_indices(len(self.df_filled))
 
-        if not self.show_fill_na_value:
-            # 如果在一开始就出现了na_value，可以通过将na_value排名设置为靠后数值，从而避免在一开始显示na_value
-            na_value_position = self.df_filled == self.fill_na_value
-            self.df_rank_filled[na_value_position] = self.chart_top_n
+        with self.profiler.phase('na_value_and_filter'):
+            if not self.show_fill_na_value:
+                # 如果在一开始就出现了na_value，可以通过将na_value排名设置为靠后数值，从而避免在一开始显示na_value
+                na_value_position = self.df_filled == self.fill_na_value
+                self.df_rank_filled[na_value_position] = self.chart_top_n
 
-            # 如果在下降过程中出现na_value，可以通过ffill将na_value设置为前面的数值，这样的话bar在消失的过程中数值是不变的，避免显示na_value
-            self.df_filled.replace(self.fill_na_value, value=None, inplace=True, method="ffill")
+                # 如果在下降过程中出现na_value，可以通过ffill将na_value设置为前面的数值，这样的话bar在消失的过程中数值是不变的，避免显示na_value
+                self.df_filled.replace(self.fill_na_value, value=None, inplace=True, method="ffill")
 
-        # 为了提高性能，过滤出只在动画中出现的category
-        if self.chart_top_n < self.df_filled.shape[1]:
-            # 如果在动画中出现，说明排名在 0 ~ self.chart_top_n - 1 之间
-            column_in_animation = (self.df_rank_filled < self.chart_top_n).any()
-            if not column_in_animation.all():
-                self.df_filled = self.df_filled.loc[:, column_in_animation]
-                self.df_rank_filled = self.df_rank_filled.loc[:, column_in_animation]
+            # 为了提高性能，过滤出只在动画中出现的category
+            if self.chart_top_n < self.df_filled.shape[1]:
+                # 如果在动画中出现，说明排名在 0 ~ self.chart_top_n - 1 之间
+                column_in_animation = (self.df_rank_filled < self.chart_top_n).any()
+                if not column_in_animation.all():
+                    self.df_filled = self.df_filled.loc[:, column_in_animation]
+                    self.df_rank_filled = self.df_rank_filled.loc[:, column_in_animation]
 
         # 排名过渡动画数据准备
-        self.make_smooth_rank_transition()
+        with self.profiler.phase('smooth_transition'):
+            self.make_smooth_rank_transition()
+
+    # 从FrameSource中计算需要渲染的帧，处理方式与_prepare_data_frame一致
+    # 排名过渡需要从第一帧开始计算，遍历时分段处理，不保存不需要的帧
+    # 种类筛选、颜色分配和图标需要所有帧的最小排名，预览帧之后的部分由FrameSource.get_min_ranks计算，不包括排名过渡
+    def _prepare_preview_frames(self):
+        data_frame = self._read_data_frame()
+        first_count, last_count = self._get_hold_frame_counts()
+
+        def get_frame_source(df):
+            return FrameSource(df, self.csv_fill_steps, first_count, last_count, self._get_index_fill_method(),
+                               interpolate=self.enable_category_value_interpolation)
+
+        if self.summary_category:
+            summary_frame_source = get_frame_source(data_frame[[self.summary_category]])
+            data_frame = data_frame.drop(columns=[self.summary_category])
+        frame_source = get_frame_source(data_frame)
+        self.time_limits = tuple(pd.Index(frame_source.get_frames([0, frame_source.frame_count - 1])[0]))
+
+        if self.preview_frame_count > 0:
+            start, stop = 0, min(self.preview_frame_count, frame_source.frame_count)
+        else:
+            stop = range(frame_source.frame_count)[self.preview_frame_index] + 1
+            # 折线图需要之前所有帧的数据
+            start = 0 if self.chart_type is ChartType.LINE_CHART else stop - 1
+            self.preview_frame_index = stop - 1 - start
+        # 数值变化需要后一帧
+        extended_stop = min(stop + 1, frame_source.frame_count)
+
+        column_count = data_frame.shape[1]
+        rank_smoother = RankTransitionSmoother(self.rank_transition_steps)
+        value_smoother = RankTransitionSmoother(self.rank_transition_steps)
+        last_values = np.full(column_count, float(self.fill_na_value))
+        column_in_animation = np.zeros(column_count, dtype=bool)
+        min_ranks = np.full(column_count, np.inf)
+        index_parts, value_parts, rank_parts = [], [], []
+        chunk_size = 1024
+        for chunk_start in range(0, extended_stop, chunk_size):
+            frames = np.arange(chunk_start, min(chunk_start + chunk_size, extended_stop))
+            index_values, values = frame_source.get_frames(frames)
+            ranks = FrameSource.get_ranks(values, self.chart_top_n)
+            if not self.show_fill_na_value:
+                na_value_position = values == self.fill_na_value
+                ranks[na_value_position] = self.chart_top_n
+                # ffill，分段开始时使用上一个分段的最后一行
+                source_rows = np.where(na_value_position, 0, np.arange(1, len(values) + 1)[:, None])
+                np.maximum.accumulate(source_rows, axis=0, out=source_rows)
+                values = np.vstack([last_values, values])[source_rows, np.arange(column_count)]
+                last_values = values[-1]
+            column_in_animation |= (ranks < self.chart_top_n).any(axis=0)
+
+            rank_smoother.smooth(ranks)
+            if not self.enable_category_value_interpolation:
+                value_smoother.smooth(values)
+            np.minimum(min_ranks, ranks.min(axis=0), out=min_ranks)
+
+            is_needed = (frames >= start) & (frames < extended_stop)
+            index_parts.append(index_values[is_needed])
+            value_parts.append(values[is_needed])
+            rank_parts.append(ranks[is_needed])
+
+        # 之后的帧不需要计算数值，只需要最小排名
+        na_value = None if self.show_fill_na_value else self.fill_na_value
+        later_min_ranks = frame_source.get_min_ranks(extended_stop, self.chart_top_n, na_value)
+        column_in_animation |= later_min_ranks < self.chart_top_n
+        np.minimum(min_ranks, later_min_ranks, out=min_ranks)
+
+        index = pd.Index(np.concatenate(index_parts), name=self.index_col)
+        if self.csv_fill_steps > 1 and len(data_frame) > 1:
+            # 与fill_csv一致：reindex之后插值帧的时间先为空值，整数时间会转换为浮点数
+            index = index.astype(pd.Series(data_frame.index[:1]).reindex([0, 1]).dtype)
+        self.df_filled = pd.DataFrame(np.concatenate(value_parts), index=index, columns=data_frame.columns)
+        self.df_rank_filled = pd.DataFrame(np.concatenate(rank_parts), index=index, columns=data_frame.columns)
+        if self.chart_top_n < column_count and not column_in_animation.all():
+            self.df_filled = self.df_filled.loc[:, column_in_animation]
+            self.df_rank_filled = self.df_rank_filled.loc[:, column_in_animation]
+            min_ranks = min_ranks[column_in_animation]
+        self.category_min_ranks = min_ranks
+
+        if self.show_value_change_indicator:
+            self._prepare_value_changed()
+            self.value_changed = self.value_changed[:stop - start]
+        self.df_filled = self.df_filled.iloc[:stop - start]
+        self.df_rank_filled = self.df_rank_filled.iloc[:stop - start]
+        if self.virtual_hold_frames:
+            self._compact_data_frames()
+        if self.summary_category:
+            self.summary_category_values = summary_frame_source.get_frames(np.arange(start, stop))[1][:, 0]
+        self.frame_row_indices = np.arange(stop - start, dtype=np.int32)
+
+    # 每一行每个种类的数值变化方向：1上升，-1下降，0不变，与change_indicator_look_ahead行之后的数值比较
+    # 分块计算，除了结果的int8矩阵之外只需要一个分块大小的临时内存
+    def _prepare_value_changed(self):
+        values = self.df_filled.values
+        row_count = len(values)
+        self.value_changed = np.zeros(values.shape, dtype=np.int8)
+        look_ahead = max(self.change_indicator_look_ahead, 1)
+        chunk_size = 1024
+        for start in range(0, row_count, chunk_size):
+            stop = min(start + chunk_size, row_count)
+            # 最后几行与最后一行比较，最后一行不变
+            later_rows = np.minimum(np.arange(start + look_ahead, stop + look_ahead), row_count - 1)
+            differences = values[later_rows] - values[start:stop]
+            # 空值和dead band以内的变化都显示为不变
+            self.value_changed[start:stop] = np.where(np.abs(differences) > self.change_indicator_dead_band, np.sign(differences), 0)
+
+    # 转换为连续存储的矩阵（排名为float32），非日期的时间索引转换为category，每个时间只保存一次字符串
+    def _compact_data_frames(self):
+        index = self.df_filled.index
+        if not isinstance(index, pd.DatetimeIndex):
+            index = pd.CategoricalIndex(index, name=self.index_col)
+        columns = self.df_filled.columns
+        self.df_filled = pd.DataFrame(self.df_filled.to_numpy(dtype=float), index=index, columns=columns)
+        self.df_rank_filled = pd.DataFrame(self.df_rank_filled.to_numpy(dtype=np.float32), index=index, columns=columns)
+
+    def _report_memory_usage(self):
+        data_frames = {'数值': self.df_filled, '排名': self.df_rank_filled}
+        usages = [f"{name}{df.memory_usage(deep=True).sum() / 1024 ** 2:.2f}MB" for name, df in data_frames.items()]
+        if self.show_value_change_indicator:
+            usages.append(f"数值变化{self.value_changed.nbytes / 1024 ** 2:.2f}MB")
+        print(f"帧数据占用内存：{'，'.join(usages)}（数据行数：{len(self.df_filled)}，视频帧数：{len(self.frame_row_indices)}）")
+
+    # 预处理结果只取决于csv内容和以下参数
+    def _get_prepared_data_key(self):
+        return get_cache_key(self.csv_path, {
+            'is_line_chart': self.chart_type is ChartType.LINE_CHART,
+            'index_col': self.index_col,
+            'frame_interval': self.frame_interval,
+            'period_duration': self.period_duration,
+            'rank_transition_duration': self.rank_transition_duration,
+            'first_frame_duration': self.first_frame_duration,
+            'last_frame_duration': self.last_frame_duration,
+            'statistics_time': self.statistics_time.name,
+            'enable_category_value_interpolation': self.enable_category_value_interpolation,
+            'intermediate_na_fill_method': self.intermediate_na_fill_method,
+            'fill_na_value': self.fill_na_value,
+            'show_fill_na_value': self.show_fill_na_value,
+            'chart_top_n': self.chart_top_n,
+            'summary_category': self.summary_category,
+            'show_value_change_indicator': self.show_value_change_indicator,
+            'change_indicator_look_ahead': self.change_indicator_look_ahead,
+            'change_indicator_dead_band': self.change_indicator_dead_band,
+            'virtual_hold_frames': self.virtual_hold_frames,
+        })
+
+    def _save_prepared_data(self, key):
+        arrays = {
+            'filled': self.df_filled.values,
+            'rank_filled': self.df_rank_filled.values,
+            'frame_row_indices': self.frame_row_indices,
+        }
+        if self.show_value_change_indicator:
+            arrays['value_changed'] = self.value_changed
+        if self.summary_category:
+            arrays['summary_category_values'] = self.summary_category_values
+
+        index = self.df_filled.index
+        is_datetime_index = isinstance(index, pd.DatetimeIndex)
+        meta = {
+            'columns': self.df_filled.columns.tolist(),
+            'index': (index.asi8 if is_datetime_index else index.astype(object)).tolist(),
+            'is_datetime_index': is_datetime_index,
+            'chart_top_n': self.chart_top_n,
+        }
+        save_prepared_data(self.prepared_data_cache_dir, key, arrays, meta)
+
+    # 加载的矩阵是只读的内存映射，DataFrame直接使用，不会复制
+    def _load_prepared_data(self, key):
+        prepared_data = load_prepared_data(self.prepared_data_cache_dir, key)
+        if prepared_data is None:
+            return False
+        arrays, meta = prepared_data
+
+        if meta['is_datetime_index']:
+            index = pd.DatetimeIndex(pd.to_datetime(meta['index']), name=self.index_col)
+        elif self.virtual_hold_frames:
+            index = pd.CategoricalIndex(meta['index'], name=self.index_col)
+        else:
+            index = pd.Index(meta['index'], name=self.index_col)
+        columns = pd.Index(meta['columns'])
+        self.df_filled = pd.DataFrame(arrays['filled'], index=index, columns=columns, copy=False)
+        self.df_rank_filled = pd.DataFrame(arrays['rank_filled'], index=index, columns=columns, copy=False)
+        if self.show_value_change_indicator:
+            self.value_changed = arrays['value_changed']
+        if self.summary_category:
+            self.summary_category_values = arrays['summary_category_values']
+        self.frame_row_indices = arrays['frame_row_indices']
+        self.chart_top_n = meta['chart_top_n']
+        return True
 
     def _adjust_video_save_params(self):
         if self.is_preview_mode:
-            self.frame_count = self.preview_frame_count or len(self.df_filled)
+            self.frame_count = self.preview_frame_count or len(self.frame_row_indices)
         else:
-            self.frame_count = len(self.df_filled)
+            self.frame_count = len(self.frame_row_indices)
         self.video_duration = math.ceil(self.frame_count * self.frame_interval * 1.0 / 1000)
 
     def _get_top_categories_group_config(self):
+        import configparser
         config = configparser.ConfigParser(allow_no_value=True)
         config.optionxform = str
         config.read(self.top_categories_group_file)
@@ -341,6 +666,8 @@ class DataVideoGenerator:
         if self.chart_category_icon_position is ChartCategoryIconPosition.HIDE:
             return
         self.category_images = {}
+        # 每个种类的OffsetImage只创建一次，所有帧共用
+        self.category_offset_images = {}
         top_categories = self.get_total_top_categories(self.chart_top_n)
         if self.category_icons_dir is None:
             if '中国' in top_categories:
@@ -365,7 +692,18 @@ class DataVideoGenerator:
             image_path = f"{self.category_icons_dir}/{category_name}.{image_format}"
             if os.path.exists(image_path):
                 break
-        return plt.imread(image_path)
+        if self.presample_category_icons:
+            return read_resized_image(image_path, self.chart_category_icon_zoom, self.video_dpi, self.icon_cache_dir)
+        return read_image(image_path)
+
+    def _get_category_offset_image(self, category_name):
+        if category_name not in self.category_offset_images:
+            # 预先缩放的icon按照原始像素大小显示
+            zoom = 72 / self.video_dpi if self.presample_category_icons else self.chart_category_icon_zoom
+            img = OffsetImage(self.category_images[category_name], zoom=zoom)
+            img.image.axes = self.ax
+            self.category_offset_images[category_name] = img
+        return self.category_offset_images[category_name]
 
     def _adjust_offset_params(self):
         if self.chart_type is ChartType.GRID_AND_BAR:
@@ -394,26 +732,27 @@ class DataVideoGenerator:
             if self.chart_type is ChartType.GRID_AND_BAR:
                 self.chart_number_font_size = 18
 
+    # 动画中曾经进入前top_n名的种类，按照表格列的次序返回，保证每次运行的颜色分配一致
     def get_total_top_categories(self, top_n):
-        total = []
-        for row_index in range(len(self.df_rank_filled)):
-            rank_list = self.df_rank_filled.iloc[row_index].values
-            top_filter = (rank_list >= 0) & (rank_list < top_n)
-            labels = self.df_filled.columns[top_filter].values.tolist()
-            total += labels
-        total = list(set(total))
-        return total
+        if top_n not in self.total_top_categories_cache:
+            if self.category_min_ranks is None:
+                rank_matrix = self.df_rank_filled.values
+                column_in_top_n = ((rank_matrix >= 0) & (rank_matrix < top_n)).any(axis=0)
+            else:
+                column_in_top_n = self.category_min_ranks < top_n
+            self.total_top_categories_cache[top_n] = self.df_filled.columns[column_in_top_n].tolist()
+        return list(self.total_top_categories_cache[top_n])
 
+    # 第一列条形的长度：数值除以该行第一列中的最大数值，不在第一列的种类为nan
     def get_normalized_number_values_of_first_column(self):
-        total = []
         grid_bar_max_width = self.grid_second_column_x_position - 0.08 - self.grid_bar_x_position
-        for row_index in range(len(self.df_rank_filled)):
-            rank_list = self.df_rank_filled.iloc[row_index].values
-            top_filter = (rank_list >= 0) & (rank_list < self.rows_in_column - 0.5)
-            value_list = self.df_filled.iloc[row_index].values[top_filter]
-            value_list = value_list / max(value_list) * grid_bar_max_width
-            total.append(value_list)
-        return total
+        rank_matrix = self.df_rank_filled.values
+        value_matrix = self.df_filled.to_numpy(dtype=float)
+        first_column_filter = (rank_matrix >= 0) & (rank_matrix < self.rows_in_column - 0.5)
+        row_max_values = np.max(value_matrix, axis=1, where=first_column_filter, initial=-np.inf, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized_values = value_matrix / row_max_values * grid_bar_max_width
+        return np.where(first_column_filter, normalized_values, np.nan).astype(np.float32)
 
     def _validate_params(self):
         assert self.rank_transition_duration <= self.period_duration, "排名过渡时间不能大于相邻时间段间隔时间"
@@ -421,78 +760,91 @@ class DataVideoGenerator:
 
     # 线性填充数据，用于实现平滑过渡效果
     def fill_csv(self, df_arg, with_rank=True):
-        _df = df_arg.reset_index()
-        _df.index = _df.index * self.csv_fill_steps
-        last_idx = _df.index[-1] + 1
+        with self.profiler.phase('fill'):
+            _df = df_arg.reset_index()
+            _df.index = _df.index * self.csv_fill_steps
+            last_idx = _df.index[-1] + 1
 
-        df_expanded = _df.reindex(range(last_idx))
+            df_expanded = _df.reindex(range(last_idx))
 
-        if self.statistics_time is StatisticsTime.START_OF_THE_YEAR or not self.enable_category_value_interpolation:
-            df_expanded[self.index_col] = df_expanded[self.index_col].fillna(method='ffill')
-        elif self.statistics_time is StatisticsTime.END_OF_THE_YEAR:
-            df_expanded[self.index_col] = df_expanded[self.index_col].fillna(method='bfill')
+            df_expanded[self.index_col] = df_expanded[self.index_col].fillna(method=self._get_index_fill_method())
 
-        df_expanded = df_expanded.set_index(self.index_col)
-        if self.enable_category_value_interpolation:
-            df_expanded = df_expanded.interpolate()
-        else:
-            df_expanded = df_expanded.fillna(method='ffill')
+            df_expanded = df_expanded.set_index(self.index_col)
+            if self.enable_category_value_interpolation:
+                df_expanded = df_expanded.interpolate()
+            else:
+                df_expanded = df_expanded.fillna(method='ffill')
 
-        # 填充第一帧和最后一帧的定格时间
-        replicated_count = round(self.last_frame_duration / self.frame_interval)
-        if replicated_count > 0:
-            df_expanded = df_expanded.append(df_expanded.iloc[[-1] * replicated_count])
+            # 填充第一帧和最后一帧的定格时间
+            _, replicated_count = self._get_replicated_row_counts()
+            if replicated_count > 0:
+                df_expanded = df_expanded.append(df_expanded.iloc[[-1] * replicated_count])
 
-        replicated_count = round(self.first_frame_duration / self.frame_interval)
-        if replicated_count > 0:
-            df_expanded = df_expanded.iloc[[0] * replicated_count].append(df_expanded)
+            replicated_count, _ = self._get_replicated_row_counts()
+            if replicated_count > 0:
+                df_expanded = df_expanded.iloc[[0] * replicated_count].append(df_expanded)
 
         if with_rank:
-            df_rank_expanded = df_expanded.rank(axis=1, method='first', ascending=False).clip(upper=self.chart_top_n + 1)
-            # rank范围：[0, self.chart_top_n - 1]，并且数值越小，排名越靠前
-            df_rank_expanded = df_rank_expanded - 1
+            with self.profiler.phase('rank'):
+                df_rank_expanded = df_expanded.rank(axis=1, method='first', ascending=False).clip(upper=self.chart_top_n + 1)
+                # rank范围：[0, self.chart_top_n - 1]，并且数值越小，排名越靠前
+                df_rank_expanded = df_rank_expanded - 1
             return df_expanded, df_rank_expanded
         return df_expanded
 
-    # 排名动画自然过渡，首先筛选出排名动画过渡起始时刻的排名数值，然后对这两个数值进行线性变化，将过渡过程中的排名数值一一替换即可
+    # 插值帧显示的时间：数据表示年初时使用前一行的时间，表示年末时使用后一行的时间
+    def _get_index_fill_method(self):
+        if self.statistics_time is StatisticsTime.START_OF_THE_YEAR or not self.enable_category_value_interpolation:
+            return 'ffill'
+        return 'bfill'
+
+    def _get_hold_frame_counts(self):
+        return round(self.first_frame_duration / self.frame_interval), round(self.last_frame_duration / self.frame_interval)
+
+    # 实际复制的定格数据行数量
+    def _get_replicated_row_counts(self):
+        first_count, last_count = self._get_hold_frame_counts()
+        if not self.virtual_hold_frames:
+            return first_count, last_count
+        # 开始保留一行：定格期间的数值变化为0
+        # 结束保留两次排名过渡的行数：最后一次过渡以及过渡期间被推迟的变化都需要在定格期间完成
+        return min(first_count, 1), min(last_count, 2 * self.rank_transition_steps)
+
+    # 每一帧对应的数据行，没有复制的定格帧对应相邻的定格数据行
+    def _get_frame_row_indices(self, row_count):
+        first_count, last_count = self._get_hold_frame_counts()
+        first_replicated_count, last_replicated_count = self._get_replicated_row_counts()
+        return np.concatenate([
+            np.zeros(first_count - first_replicated_count, dtype=np.int32),
+            np.arange(row_count, dtype=np.int32),
+            np.full(last_count - last_replicated_count, row_count - 1, dtype=np.int32),
+        ])
+
+    # 排名动画自然过渡，见RankTransitionSmoother
     def make_smooth_rank_transition(self):
-        # value_list: ndarray
-        # 假设过渡动画帧数量为2，输入为 ndarray:
-        # [1,    1,    1,       1,       2,       2,        2]
-        # 输出为 ndarray：
-        # [1,    1,    1,       1,       1.3333,  1.66667,  2]
-        def smooth_rank(value_list):
-            last_rank = value_list[0]
-            i = 0
-            while i < len(value_list):
-                current_rank = value_list[i]
-                if current_rank == last_rank:
-                    i += 1
-                    continue
-                transition_rank_list = np.linspace(last_rank, current_rank, num=self.rank_transition_steps)
-                # 将过渡期间的排名数值替换掉
-                transition_start_index = i - 1
-                value_list.put(
-                    range(transition_start_index, transition_start_index + self.rank_transition_steps),
-                    transition_rank_list
-                )
-                last_rank = current_rank
-                i = transition_start_index + self.rank_transition_steps
-            return value_list
-
-        for column in self.df_rank_filled:
-            self.df_rank_filled[column] = smooth_rank(self.df_rank_filled[column].values)
+        self.df_rank_filled = pd.DataFrame(
+            RankTransitionSmoother(self.rank_transition_steps).smooth(self.df_rank_filled.to_numpy(dtype=float, copy=True)),
+            index=self.df_rank_filled.index, columns=self.df_rank_filled.columns
+        )
         if not self.enable_category_value_interpolation:
-            for column in self.df_filled:
-                self.df_filled[column] = smooth_rank(self.df_filled[column].values)
+            self.df_filled = pd.DataFrame(
+                RankTransitionSmoother(self.rank_transition_steps).smooth(self.df_filled.to_numpy(dtype=float, copy=True)),
+                index=self.df_filled.index, columns=self.df_filled.columns
+            )
 
     def set_figure_background(self):
-        if not self._is_background_image_exist():
-            if self.chart_type in [ChartType.GRID, ChartType.GRID_AND_BAR]:
-                self.generate_rank_background()
-            else:
-                return
-        background = plt.imread(self.background_image_path)
+        if self._is_background_image_exist():
+            background = plt.imread(self.background_image_path)
+        elif self.chart_type not in [ChartType.GRID, ChartType.GRID_AND_BAR]:
+            return
+        elif self.composite_static_layer:
+            # 并行渲染时子进程使用主进程生成的排名背景
+            if self.rank_background_image is None:
+                self.rank_background_image = self.render_rank_background()
+            background = self.rank_background_image.astype(np.float32) / 255
+        else:
+            self.generate_rank_background()
+            background = plt.imread(self.background_image_path)
         self.fig.figimage(background, alpha=self.background_image_alpha).set_zorder(0)
         self.ax.set_zorder(1)
 
@@ -506,64 +858,64 @@ class DataVideoGenerator:
         self.ax.set_ylim(0.5, self.rows_in_column + 0.5)
         self.ax.set_xlim(0, self.max_xlim)
 
-    def line_chart_update(self, row_index):
+    # 折线图每一帧只在已有的线后面追加数据，需要的数组只计算一次
+    def _prepare_line_chart_data(self):
+        self.line_values = self.df_filled.values
+        self.line_x_values = date2num(self.df_filled.index.values)
+        self.line_time_labels = pd.to_datetime(self.df_filled.index).strftime(self.date_time_format)
+        if self.show_max_and_min:
+            # 每一列到当前行为止的最大值和最小值，忽略空值
+            self.line_running_max_values = np.fmax.accumulate(self.line_values, axis=0)
+            self.line_running_min_values = np.fmin.accumulate(self.line_values, axis=0)
+        # 纵轴范围由到当前行为止所有种类的数值决定
+        self.line_running_y_limits = np.column_stack([
+            np.fmin.accumulate(np.fmin.reduce(self.line_values, axis=1)),
+            np.fmax.accumulate(np.fmax.reduce(self.line_values, axis=1)),
+        ])
+
+    def _init_line_chart_artists(self):
         self.ax.clear()
-        df = self.df_filled.head(row_index + 1)
-        time_list = df.index.values
-
-        for i, (category, category_values) in enumerate(df.iteritems()):
+        self.line_artists = []
+        for i, category in enumerate(self.df_filled.columns):
             color = self.bar_colors[category]
-            self.ax.plot(time_list, category_values, color=color, linewidth=self.line_width)
-            x_value = date2num(time_list[-1])
-            y_value = category_values[-1]
+            artists = {}
+            artists['line'], = self.ax.plot([], [], color=color, linewidth=self.line_width)
             if self.show_category_bbox:
                 bbox_props = dict(fill=False, boxstyle=f"square,pad={self.category_bbox_pad}",
-                                           ec=color,
-                                           alpha=self.bar_alpha, lw=self.bbox_line_width)
+                                  ec=color,
+                                  alpha=self.bar_alpha, lw=self.bbox_line_width)
                 x_offset = self.bbox_x_offset
             else:
                 bbox_props = None
-                x_offset = self.category_x_offset
-            self.ax.annotate(f"{category} {self.number_format.format(x=y_value)}", (x_value, y_value),
-                             xytext=(x_offset, 0), weight='800',
-                             bbox=bbox_props,
-                             xycoords='data', textcoords='offset points',
-                             fontsize=self.chart_category_font_size,
-                             va="center", color=self.chart_category_color, ha="left",
-                             fontname=self.category_font_name)
+                x_offset = self.category_x_offset or 0
+            artists['label'] = self.ax.annotate('', (0, 0),
+                                                xytext=(x_offset, 0), weight='800',
+                                                bbox=bbox_props,
+                                                xycoords='data', textcoords='offset points',
+                                                fontsize=self.chart_category_font_size,
+                                                va="center", color=self.chart_category_color, ha="left",
+                                                fontname=self.category_font_name)
 
             if self.show_max_and_min:
-                # 显示最小和最大值
-                min_value, max_value = self.category_min_max_dict[category]
-                if y_value < min_value:
-                    min_value = y_value
-                if y_value > max_value:
-                    max_value = y_value
-                self.category_min_max_dict[category] = [min_value, max_value]
-                # 表格列靠前的在最上面
+                # 显示最小和最大值，表格列靠前的在最上面
                 y_offset = i * self.max_min_area_y_offset
-                self.ax.text(
-                    self.max_min_area_first_x1_position, self.max_min_area_first_y1_position - y_offset, self.number_format.format(x=max_value), transform=self.fig.transFigure, size=30,
+                artists['max'] = self.ax.text(
+                    self.max_min_area_first_x1_position, self.max_min_area_first_y1_position - y_offset, '', transform=self.fig.transFigure, size=30,
                     ha='left'
                 )
-                # self.ax.text(
-                #     0.8, 0.75 - y_offset, self.number_format.format(x=y_value), transform=self.fig.transFigure, size=30,
-                #     ha='left'
-                # )
-                self.ax.text(
-                    self.max_min_area_first_x2_position, self.max_min_area_first_y2_position - y_offset, self.number_format.format(x=min_value), transform=self.fig.transFigure, size=30,
+                artists['min'] = self.ax.text(
+                    self.max_min_area_first_x2_position, self.max_min_area_first_y2_position - y_offset, '', transform=self.fig.transFigure, size=30,
                     ha='left'
                 )
+            self.line_artists.append(artists)
 
         # 时间
-        data_time = pd.to_datetime(str(time_list[-1])).strftime(self.date_time_format)
-        self.ax.text(self.time_x_position, self.time_y_position, data_time, transform=self.fig.transFigure,
-                     size=self.chart_time_font_size, ha='right', color=self.chart_time_color, weight='1000',
-                     family='monospace', fontname=self.time_font_name).set_zorder(0)
+        self.time_label_artist = self._draw_time_text('')
+        self.time_label_artist.set_zorder(0)
 
         self.ax.yaxis.set_major_formatter(self.tick_label_format)
         self.ax.tick_params(axis='both', colors=self.tick_label_color, labelsize=self.tick_label_font_size, length=0)
-        self.ax.set_xlim(self.min_xlim, self.max_xlim)
+        self.ax.set_xlim(date2num(self.min_xlim), date2num(self.max_xlim))
         # only works on linux/macos
         self.ax.xaxis.set_ticks_position(self.tick_position)
         self.ax.xaxis.set_major_formatter(DateFormatter("%Y%年%-m月"))
@@ -574,44 +926,124 @@ class DataVideoGenerator:
 
         self._optimise_ax()
 
+        # 需要在调整边距之后获取横轴的像素宽度
+        self.line_decimator = None
+        if self.decimate_line_chart:
+            x_min, x_max = self.ax.get_xlim()
+            line_decimator = LineDecimator(self.line_x_values, self.line_values, x_min, x_max, math.ceil(self.ax.bbox.width))
+            if line_decimator.is_effective():
+                self.line_decimator = line_decimator
+
+    def line_chart_update(self, row_index):
+        end = row_index + 1
+        x_values = self.line_x_values[:end]
+        x_value = self.line_x_values[row_index]
+        for i, (category, artists) in enumerate(zip(self.df_filled.columns, self.line_artists)):
+            y_value = self.line_values[row_index, i]
+            if self.line_decimator:
+                artists['line'].set_data(*self.line_decimator.get_line(row_index, i))
+            else:
+                artists['line'].set_data(x_values, self.line_values[:end, i])
+            artists['label'].set_text(f"{category} {self.number_format.format(x=y_value)}")
+            artists['label'].xy = (x_value, y_value)
+            if self.show_max_and_min:
+                artists['max'].set_text(self.number_format.format(x=self.line_running_max_values[row_index, i]))
+                artists['min'].set_text(self.number_format.format(x=self.line_running_min_values[row_index, i]))
+
+        # 与每一帧重新plot时的自动缩放结果一致
+        y_min, y_max = self.line_running_y_limits[row_index]
+        self.ax.dataLim.set_points(np.array([[self.line_x_values[0], y_min], [x_value, y_max]]))
+        self.ax.autoscale_view(scalex=False)
+
+        self.time_label_artist.set_text(self.line_time_labels[row_index])
+
     def _draw_category_bbox(self, category_label, number_value, x, y):
-        self.ax.annotate(f"{category_label} {number_value}", (x, y),
-                         xytext=(self.bbox_x_offset, 0), weight='800', zorder=0,
-                         bbox=dict(fill=False, boxstyle=f"square,pad={self.category_bbox_pad}",
-                                   ec=self.bar_colors[category_label],
-                                   alpha=self.bar_alpha, lw=self.bbox_line_width),
-                         xycoords='data', textcoords='offset points',
-                         fontsize=self.chart_category_font_size,
-                         va="center", color=self.chart_category_color, ha="left",
-                         fontname=self.category_font_name)
+        style = dict(weight='800',
+                     bbox=dict(fill=False, boxstyle=f"square,pad={self.category_bbox_pad}",
+                               ec=self.bar_colors[category_label],
+                               alpha=self.bar_alpha, lw=self.bbox_line_width),
+                     fontsize=self.chart_category_font_size,
+                     va="center", color=self.chart_category_color, ha="left",
+                     fontname=self.category_font_name)
+        if self.text_raster_cache:
+            return self._add_raster_text(f"{category_label} {number_value}", (x, y), (self.bbox_x_offset, 0), style,
+                                         zorder=0)
+        return self.ax.annotate(f"{category_label} {number_value}", (x, y),
+                         xytext=(self.bbox_x_offset, 0), zorder=0,
+                         xycoords='data', textcoords='offset points', **style)
 
     def _draw_category_label(self, category_label, x, y):
         category_label_x_position = 0 if self.category_label_position is CategoryLabelPosition.LEFT else x
-        self.ax.annotate(category_label, (category_label_x_position, y),
-                         xytext=(self.category_x_offset, 0), weight='800',
-                         xycoords='data', textcoords='offset points', fontsize=self.chart_category_font_size,
-                         va="center", color=self.chart_category_color, ha="right", fontname=self.category_font_name)
+        style = dict(weight='800', fontsize=self.chart_category_font_size,
+                     va="center", color=self.chart_category_color, ha="right", fontname=self.category_font_name)
+        if self.text_raster_cache:
+            # 种类名称的图片一直保留在缓存中
+            return self._add_raster_text(category_label, (category_label_x_position, y), (self.category_x_offset, 0),
+                                         style, pinned=True)
+        return self.ax.annotate(category_label, (category_label_x_position, y),
+                         xytext=(self.category_x_offset, 0),
+                         xycoords='data', textcoords='offset points', **style)
 
     def _draw_category_number(self, number_value, x, y):
-        self.ax.annotate(number_value, (x, y),
+        style = dict(fontsize=self.chart_number_font_size, weight=self.number_font_weight,
+                     va="center", color=self.chart_number_color, fontname=self.number_font_name)
+        if self.text_raster_cache:
+            return self._add_raster_text(number_value, (x, y), (self.number_x_offset, 0), style)
+        return self.ax.annotate(number_value, (x, y),
                          xytext=(self.number_x_offset, 0),
-                         xycoords='data', textcoords='offset points', fontsize=self.chart_number_font_size,
-                         weight=self.number_font_weight,
-                         va="center", color=self.chart_number_color, fontname=self.number_font_name)
-
-    def _draw_category_icon(self, category_icon, x, y):
+                         xycoords='data', textcoords='offset points', **style)
+
+    # GRID和GRID_AND_BAR的种类名称，与_draw_category_label不同，不指定字体
+    def _draw_grid_category_label(self, category_label, x, y):
+        style = dict(fontsize=self.chart_category_font_size, va="center", color=self.chart_category_color, ha="right")
+        if self.text_raster_cache:
+            return self._add_raster_text(category_label, (x, y), (self.category_x_offset, 0), style, pinned=True)
+        return self.ax.annotate(category_label, (x, y),
+                                xytext=(self.category_x_offset, 0),
+                                xycoords='data', textcoords='offset points', **style)
+
+    # GRID和GRID_AND_BAR的数字，与ax.text一致，锚点在坐标轴范围之外时仍然显示；空值文字使用默认字体
+    def _draw_grid_number(self, number_value, x, y, is_na_value=False):
+        style = dict(ha='left', size=self.chart_number_font_size, weight=self.number_font_weight,
+                     va='center', color=self.chart_number_color)
+        if not is_na_value:
+            style['fontname'] = self.number_font_name
+        if self.text_raster_cache:
+            return self._add_raster_text(number_value, (x, y), (0, 0), style, pinned=is_na_value,
+                                         transform=self.ax.transData)
+        return self.ax.text(x, y, number_value, **style)
+
+    # 绘制使用TextRasterCache中的图片的文字，transform为None时xy为数据坐标
+    def _add_raster_text(self, text, xy, offset, style, pinned=False, transform=None, zorder=None):
+        artist = RasterText(self.text_raster_cache, text, xy, style, offset=offset, pinned=pinned,
+                            clip_to_axes=transform is None)
+        if transform is not None:
+            artist.set_transform(transform)
+        if zorder is not None:
+            artist.set_zorder(zorder)
+        return self.ax.add_artist(artist)
+
+    def _draw_category_icon(self, category_name, x, y):
         icon_x_position = 0 if self.chart_category_icon_position is ChartCategoryIconPosition.LEFT else x
-        img = OffsetImage(category_icon, zoom=self.chart_category_icon_zoom)
-        img.image.axes = self.ax
+        img = self._get_category_offset_image(category_name)
         ab = AnnotationBbox(img, (icon_x_position, y), xybox=(self.icon_x_offset, 0), frameon=False,
                             xycoords='data', boxcoords='offset points', pad=0)
-        self.ax.add_artist(ab)
+        return self.ax.add_artist(ab)
+
+    def _get_time_label(self, time_label):
+        return pd.to_datetime(time_label).strftime(self.date_time_format)
 
     def _draw_time_label(self, time_label):
-        data_time = pd.to_datetime(time_label).strftime(self.date_time_format)
-        self.ax.text(self.time_x_position, self.time_y_position, data_time, transform=self.fig.transFigure,
-                     size=self.chart_time_font_size, ha='right', color=self.chart_time_color, weight='1000',
+        return self._draw_time_text(self._get_time_label(time_label))
+
+    def _draw_time_text(self, data_time):
+        style = dict(size=self.chart_time_font_size, ha='right', color=self.chart_time_color, weight='1000',
                      family='monospace', fontname=self.time_font_name)
+        if self.text_raster_cache:
+            return self._add_raster_text(data_time, (self.time_x_position, self.time_y_position), (0, 0), style,
+                                         transform=self.fig.transFigure)
+        return self.ax.text(self.time_x_position, self.time_y_position, data_time, transform=self.fig.transFigure,
+                     **style)
 
     def _optimise_ax(self):
         self.ax.set_axisbelow(True)
@@ -623,17 +1055,18 @@ class DataVideoGenerator:
         self.ax.clear()
         self.ax.set_ylim(0.1, self.chart_top_n + 0.5)
 
-        # 获取一行数据并排序
-        y = self.df_rank_filled.iloc[row_index].values
-        top_filter = (y >= 0) & (y < self.chart_top_n)
-        y = self.chart_top_n - y[top_filter]
-        width = self.df_filled.iloc[row_index].values[top_filter]
-        labels = self.df_filled.columns[top_filter]
+        # 获取一帧的布局数据
+        frame_slice = self.frame_plan.get_frame_slice(row_index)
+        category_indices = self.frame_plan.category_indices[frame_slice]
+        y = self.frame_plan.y_values[frame_slice]
+        width = self.frame_plan.number_values[frame_slice]
+        number_labels = self.frame_plan.number_labels[frame_slice]
+        labels = self.df_filled.columns[category_indices]
 
         if self.bar_color_type is BarColorType.SINGLE_COLOR:
             bar_color = self.bar_color
         else:
-            bar_color = [self.bar_colors[x] for x in labels]
+            bar_color = self.frame_plan.get_frame_colors(frame_slice)
         self.ax.barh(y=y, width=width, height=self.bar_height, color=bar_color, tick_label=labels, alpha=self.bar_alpha)
         self.ax.set_yticks([])
 
@@ -646,7 +1079,7 @@ class DataVideoGenerator:
             if float(y_value) < 0:
                 number_value = self.na_value_display_text
             else:
-                number_value = self.number_format.format(x=x_value)
+                number_value = number_labels[i_]
 
             # 种类文字和数字
             if self.show_category_bbox:
@@ -656,10 +1089,10 @@ class DataVideoGenerator:
                 self._draw_category_number(number_value, x_value, y_value)
             # 种类icon
             if self.chart_category_icon_position is not ChartCategoryIconPosition.HIDE:
-                self._draw_category_icon(self.category_images[category_name], x_value, y_value)
+                self._draw_category_icon(category_name, x_value, y_value)
 
         # 时间
-        self._draw_time_label(str(self.df_filled.index[row_index]))
+        self._draw_time_text(self.frame_plan.time_labels[row_index])
 
         if self.is_show_grid:
             self.ax.xaxis.set_major_formatter(self.tick_label_format)
@@ -676,31 +1109,42 @@ class DataVideoGenerator:
         self._optimise_ax()
 
     def _display_champion_image(self, row_index):
-        img = OffsetImage(
-            self.champion_images[self.df_champion_categories.iloc[row_index]],
-            zoom=self.champion_image_zoom
-        )
+        champion_category = self.df_champion_categories.iloc[row_index]
+        if champion_category not in self.champion_offset_images:
+            self.champion_offset_images[champion_category] = OffsetImage(
+                self.champion_images[champion_category], zoom=self.champion_image_zoom
+            )
+        img = self.champion_offset_images[champion_category]
         ab = AnnotationBbox(img, (
             self.champion_image_position[0], self.champion_image_position[1]), frameon=False,
                             xycoords='figure fraction', pad=0)
-        self.ax.add_artist(ab)
+        return self.ax.add_artist(ab)
+
+    def _draw_change_indicator(self, change_value, x, y):
+        return self.ax.annotate(self.change_indicator_symbols[change_value], (x, y),
+                                xytext=(self.change_indicator_x_offset, 0),
+                                xycoords='data', textcoords='offset points', fontsize=self.arrow_indicator_font_size,
+                                weight="1000", fontname="Hiragino Sans",
+                                family='monospace',
+                                va="center", color=self.change_indicator_colors[change_value])
 
     def h_bar_chart_with_change_indicator_update(self, row_index):
         self.ax.clear()
         self.ax.set_ylim(0.1, self.chart_top_n + 0.5)
 
-        # 获取一行数据并排序
-        y = self.df_rank_filled.iloc[row_index].values
-        top_filter = (y >= 0) & (y < self.chart_top_n)
-        y = self.chart_top_n - y[top_filter]
-        width = self.df_filled.iloc[row_index].values[top_filter]
-        labels = self.df_filled.columns[top_filter]
-        change_indicators = self.df_value_changed.iloc[row_index].values[top_filter]
+        # 获取一帧的布局数据
+        frame_slice = self.frame_plan.get_frame_slice(row_index)
+        category_indices = self.frame_plan.category_indices[frame_slice]
+        y = self.frame_plan.y_values[frame_slice]
+        width = self.frame_plan.number_values[frame_slice]
+        number_labels = self.frame_plan.number_labels[frame_slice]
+        labels = self.df_filled.columns[category_indices]
+        change_indicators = self.frame_plan.change_indicators[frame_slice]
 
         if self.bar_color_type is BarColorType.SINGLE_COLOR:
             bar_color = self.bar_color
         else:
-            bar_color = [self.bar_colors[x] for x in labels]
+            bar_color = self.frame_plan.get_frame_colors(frame_slice)
         self.ax.barh(y=y, width=width, height=self.bar_height, color=bar_color, tick_label=labels, alpha=self.bar_alpha)
         self.ax.set_yticks([])
 
@@ -713,7 +1157,7 @@ class DataVideoGenerator:
             if float(y_value) < 0:
                 number_value = self.na_value_display_text
             else:
-                number_value = self.number_format.format(x=x_value)
+                number_value = number_labels[i_]
 
             # 种类文字和数字
             if self.show_category_bbox:
@@ -723,20 +1167,15 @@ class DataVideoGenerator:
                 self._draw_category_number(number_value, x_value, y_value)
             # 种类icon
             if self.chart_category_icon_position is not ChartCategoryIconPosition.HIDE:
-                self._draw_category_icon(self.category_images[category_name], x_value, y_value)
+                self._draw_category_icon(category_name, x_value, y_value)
 
             # 上升、下降箭头指示
-            change_value = int(change_indicators[i_])
+            change_value = change_indicators[i_]
             if change_value != 0:
-                self.ax.annotate(self.change_indicator_symbols[change_value], (x_value, y_value),
-                                 xytext=(self.change_indicator_x_offset, 0),
-                                 xycoords='data', textcoords='offset points', fontsize=self.arrow_indicator_font_size,
-                                 weight="1000", fontname="Hiragino Sans",
-                                 family='monospace',
-                                 va="center", color=self.change_indicator_colors[change_value])
+                self._draw_change_indicator(change_value, x_value, y_value)
 
         # 时间
-        self._draw_time_label(str(self.df_filled.index[row_index]))
+        self._draw_time_text(self.frame_plan.time_labels[row_index])
 
         if self.is_show_grid:
             self.ax.xaxis.set_major_formatter(self.tick_label_format)
@@ -752,26 +1191,163 @@ class DataVideoGenerator:
 
         self._optimise_ax()
 
+    # 每个种类的bar、文字、数字、icon只创建一次，创建顺序与h_bar_chart_update中的绘制顺序一致，保证图层叠放次序相同
+    def _init_h_bar_artists(self):
+        self.ax.clear()
+        self.ax.set_ylim(0.1, self.chart_top_n + 0.5)
+        self.ax.set_yticks([])
+
+        self.h_bar_artists = []
+        for category_name in self.df_filled.columns:
+            if self.bar_color_type is BarColorType.SINGLE_COLOR:
+                bar_color = self.bar_color
+            else:
+                bar_color = self.bar_colors.get(category_name)
+            bar = Rectangle((0, 0), 0, self.bar_height, facecolor=bar_color, edgecolor='none', alpha=self.bar_alpha)
+            self.ax.add_patch(bar)
+            self.h_bar_artists.append({'bar': bar})
+
+        self.champion_image_artist = None
+        if self.show_champion_images:
+            self.champion_image_artist = self._display_champion_image(0)
+
+        for category_name, artists in zip(self.df_filled.columns, self.h_bar_artists):
+            if self.show_category_bbox:
+                artists['bbox'] = self._draw_category_bbox(category_name, '', 0, 0)
+            else:
+                artists['label'] = self._draw_category_label(category_name, 0, 0)
+                artists['number'] = self._draw_category_number('', 0, 0)
+            # 没有出现在前N名中的种类没有icon
+            if self.chart_category_icon_position is not ChartCategoryIconPosition.HIDE and category_name in self.category_images:
+                artists['icon'] = self._draw_category_icon(category_name, 0, 0)
+            if self.show_value_change_indicator:
+                artists['change_indicator'] = self._draw_change_indicator(1, 0, 0)
+            for artist in artists.values():
+                artist.set_visible(False)
+        self.h_bar_visible_category_indices = []
+
+        self.time_label_artist = self._draw_time_text(self.frame_plan.time_labels[0])
+
+        if self.is_show_grid:
+            self.ax.xaxis.set_major_formatter(self.tick_label_format)
+            self.ax.grid(which='major', axis=self.grid_axis, linestyle=self.grid_line_style, linewidth=1, color=self.chart_grid_line_color,
+                         clip_on=True)
+            self.ax.tick_params(axis='x', colors=self.tick_label_color, labelsize=self.tick_label_font_size,
+                                length=0)
+            self.ax.xaxis.set_ticks_position(self.tick_position)
+        else:
+            self.ax.set_xticks([])
+
+        self._optimise_ax()
+
+        self.animated_artists = [artist for artists in self.h_bar_artists for artist in artists.values()]
+        self.animated_artists.append(self.time_label_artist)
+        if self.champion_image_artist is not None:
+            self.animated_artists.append(self.champion_image_artist)
+
+    # 与h_bar_chart_update和h_bar_chart_with_change_indicator_update的画面一致，但只更新已有的artist
+    def h_bar_chart_retained_update(self, row_index):
+        frame_slice = self.frame_plan.get_frame_slice(row_index)
+        category_indices = self.frame_plan.category_indices[frame_slice]
+        y_list = self.frame_plan.y_values[frame_slice]
+        width_list = self.frame_plan.number_values[frame_slice]
+        number_labels = self.frame_plan.number_labels[frame_slice]
+        if self.show_value_change_indicator:
+            change_indicators = self.frame_plan.change_indicators[frame_slice]
+
+        # 隐藏上一帧显示的种类
+        for category_index in self.h_bar_visible_category_indices:
+            for artist in self.h_bar_artists[category_index].values():
+                artist.set_visible(False)
+        self.h_bar_visible_category_indices = category_indices
+
+        for i_, category_index in enumerate(category_indices):
+            category_name = self.df_filled.columns[category_index]
+            artists = self.h_bar_artists[category_index]
+            for artist in artists.values():
+                artist.set_visible(True)
+
+            x_value = width_list[i_]
+            y_value = y_list[i_]
+            # todo 有bug
+            if float(y_value) < 0:
+                number_value = self.na_value_display_text
+            else:
+                number_value = number_labels[i_]
+
+            bar = artists['bar']
+            bar.set_y(y_value - self.bar_height / 2)
+            bar.set_width(x_value)
+
+            # 种类文字和数字
+            if self.show_category_bbox:
+                artists['bbox'].set_text(f"{category_name} {number_value}")
+                artists['bbox'].xy = (x_value, y_value)
+            else:
+                category_label_x_position = 0 if self.category_label_position is CategoryLabelPosition.LEFT else x_value
+                artists['label'].xy = (category_label_x_position, y_value)
+                artists['number'].set_text(number_value)
+                artists['number'].xy = (x_value, y_value)
+            # 种类icon
+            if 'icon' in artists:
+                icon_x_position = 0 if self.chart_category_icon_position is ChartCategoryIconPosition.LEFT else x_value
+                artists['icon'].xy = (icon_x_position, y_value)
+
+            # 上升、下降箭头指示
+            if self.show_value_change_indicator:
+                change_value = change_indicators[i_]
+                change_indicator = artists['change_indicator']
+                if change_value != 0:
+                    change_indicator.set_text(self.change_indicator_symbols[change_value])
+                    change_indicator.set_color(self.change_indicator_colors[change_value])
+                    change_indicator.xy = (x_value, y_value)
+                else:
+                    change_indicator.set_visible(False)
+
+        # 与barh的自动缩放结果一致：左侧贴紧0，右侧留出margin
+        if len(width_list):
+            x_min = min(width_list.min(), 0)
+            x_max = max(width_list.max(), 0)
+            if x_max > x_min:
+                x_margin = (x_max - x_min) * self.ax.margins()[0]
+                self.ax.set_xlim(x_min - x_margin if x_min < 0 else x_min, x_max + x_margin)
+
+        if self.champion_image_artist is not None:
+            self.champion_image_artist.offsetbox.set_data(
+                self.champion_images[self.df_champion_categories.iloc[row_index]]
+            )
+
+        # 时间
+        self.time_label_artist.set_text(self.frame_plan.time_labels[row_index])
+
+        if self.is_show_grid:
+            # 隐藏x轴开始的0，新增的刻度会复制第一个刻度的属性，因此需要重新显示其余刻度
+            major_ticks = self.ax.xaxis.get_major_ticks()
+            major_ticks[0].set_visible(False)
+            for major_tick in major_ticks[1:]:
+                major_tick.set_visible(True)
+
+        return self.animated_artists
+
     def v_bar_chart_update(self, row_index):
         self.ax.clear()
         self.ax.set_xlim(0.1, self.chart_top_n + 0.5)
 
-        # 获取一行数据并排序
-        y = self.df_rank_filled.iloc[row_index].values
-        top_filter = (y >= 0) & (y < self.chart_top_n)
-        y = self.chart_top_n - y[top_filter]
-
-        width = self.df_filled.iloc[row_index].values[top_filter]
-        labels = self.df_filled.columns[top_filter]
+        # 获取一帧的布局数据，y_values是柱子在x轴上的位置
+        frame_slice = self.frame_plan.get_frame_slice(row_index)
+        y = self.frame_plan.y_values[frame_slice]
+        width = self.frame_plan.number_values[frame_slice]
+        number_labels = self.frame_plan.number_labels[frame_slice]
+        labels = self.df_filled.columns[self.frame_plan.category_indices[frame_slice]]
 
         if self.bar_color and self.bar_color_type is BarColorType.SINGLE_COLOR:
             bar_color = self.bar_color
         else:
-            bar_color = [self.bar_colors[x] for x in labels]
+            bar_color = self.frame_plan.get_frame_colors(frame_slice)
         # self.ax.bar(y, width, width=self.chart_bar_width, color=bar_color, tick_label=labels)
         self.ax.bar(y, width, color=bar_color, tick_label=labels)
 
-        if self.chart_category_icon_position is ChartCategoryIconPosition.BEFORE_BAR:
+        if self.chart_category_icon_position is ChartCategoryIconPosition.LEFT:
             self.ax.set_xticks([])
         else:
             self.ax.tick_params(axis='x', colors=self.tick_label_color, labelsize=self.tick_label_font_size,
@@ -782,11 +1358,10 @@ class DataVideoGenerator:
             # todo enum添加is_show方法
             if self.chart_category_icon_position is not ChartCategoryIconPosition.HIDE:
                 category_name = labels[i_]
-                img = OffsetImage(self.category_images[category_name], zoom=self.chart_category_icon_zoom)
-                img.image.axes = self.ax
+                img = self._get_category_offset_image(category_name)
 
                 # icon在最前面
-                if self.chart_category_icon_position is ChartCategoryIconPosition.BEFORE_BAR:
+                if self.chart_category_icon_position is ChartCategoryIconPosition.LEFT:
                     # 图片
                     ab = AnnotationBbox(img, (self.icon_x_offset, y_value), xybox=(0, 0), frameon=False,
                                         xycoords='data', boxcoords='offset points', pad=0)
@@ -799,7 +1374,7 @@ class DataVideoGenerator:
                     # 类别
                     self.ax.text(x_value - dx, y_value, category_name, ha='right', size=self.chart_category_font_size,
                                  va='center', color=self.chart_category_color, weight='800', fontname=self.category_font_name)
-                elif self.chart_category_icon_position is ChartCategoryIconPosition.BEHIND_BAR:
+                elif self.chart_category_icon_position is ChartCategoryIconPosition.RIGHT:
                     # 图片
                     ab = AnnotationBbox(img, (x_value, y_value), xybox=(0, 0),
                                         frameon=False,
@@ -822,14 +1397,14 @@ class DataVideoGenerator:
                     )
                 else:
                     self.ax.text(
-                        x_value + 0.3, y_value, self.number_format.format(x=y_value), ha='right',
+                        x_value + 0.3, y_value, number_labels[i_], ha='right',
                         size=self.chart_number_font_size, weight=self.number_font_weight, rotation=self.number_rotation,
                         va='bottom', color=self.chart_number_color, fontname=self.number_font_name
                     )
 
         # 时间
-        data_time = self.df_filled.index[row_index]
-        self.ax.text(self.time_x_position, self.time_y_position, data_time, transform=self.fig.transFigure,
+        self.ax.text(self.time_x_position, self.time_y_position, self.frame_plan.time_labels[row_index],
+                     transform=self.fig.transFigure,
                      size=self.chart_time_font_size, ha='right', color=self.chart_time_color, weight='1000',
                      family='monospace', fontname=self.time_font_name)
 
@@ -850,13 +1425,12 @@ class DataVideoGenerator:
     def grid_chart_update(self, row_index):
         self._init_ax()
 
-        # 获取一行数据并排序
-        rank_list = self.df_rank_filled.iloc[row_index].values
-        top_filter = (rank_list >= 0) & (rank_list < self.chart_top_n)
-        rank_list = rank_list[top_filter]
-
-        value_list = self.df_filled.iloc[row_index].values[top_filter]
-        labels = self.df_filled.columns[top_filter]
+        # 获取一帧的布局数据
+        frame_slice = self.frame_plan.get_frame_slice(row_index)
+        rank_list = self.frame_plan.rank_values[frame_slice]
+        value_list = self.frame_plan.number_values[frame_slice]
+        number_labels = self.frame_plan.number_labels[frame_slice]
+        labels = self.df_filled.columns[self.frame_plan.category_indices[frame_slice]]
 
         for i_, (y_value, num_value) in enumerate(zip(rank_list, value_list)):
             x_value = (y_value+0.5) // self.rows_in_column
@@ -864,15 +1438,11 @@ class DataVideoGenerator:
             # 类别
             category_name = labels[i_]
 
-            self.ax.annotate(category_name, (x_value, y_value),
-                             xytext=(self.category_x_offset, 0),
-                             xycoords='data', textcoords='offset points', fontsize=self.chart_category_font_size,
-                             va="center", color=self.chart_category_color, ha="right")
+            self._draw_grid_category_label(category_name, x_value, y_value)
 
             # todo enum添加is_show方法
             if self.chart_category_icon_position is not ChartCategoryIconPosition.HIDE:
-                img = OffsetImage(self.category_images[category_name], zoom=self.chart_category_icon_zoom)
-                img.image.axes = self.ax
+                img = self._get_category_offset_image(category_name)
 
                 # 图片
                 ab = AnnotationBbox(img, (x_value + self.icon_x_offset, y_value), xybox=(0, 0), frameon=False,
@@ -887,30 +1457,26 @@ class DataVideoGenerator:
 
             if float(num_value) < 0:
                 # 数字
-                self.ax.text(x_value + number_x_offset, y_value + self.number_y_offset, self.na_value_display_text, ha='left',
-                             size=self.chart_number_font_size, weight=self.number_font_weight,
-                             va='center', color=self.chart_number_color)
+                self._draw_grid_number(self.na_value_display_text, x_value + number_x_offset,
+                                       y_value + self.number_y_offset, is_na_value=True)
             else:
-                self.ax.text(x_value + number_x_offset, y_value + self.number_y_offset, self.number_format.format(x=num_value), ha='left',
-                             size=self.chart_number_font_size, weight=self.number_font_weight,
-                             va='center', color=self.chart_number_color, fontname=self.number_font_name)
+                self._draw_grid_number(number_labels[i_], x_value + number_x_offset, y_value + self.number_y_offset)
 
         # 时间
-        self._draw_time_label(str(self.df_filled.index[row_index]))
+        self._draw_time_text(self.frame_plan.time_labels[row_index])
         self._optimise_ax()
 
     def grid_and_bar_chart_update(self, row_index):
         self._init_ax()
 
-        # 获取一行数据并排序
-        rank_list = self.df_rank_filled.iloc[row_index].values
-        top_filter = (rank_list >= 0) & (rank_list < self.chart_top_n)
-        rank_list = rank_list[top_filter]
-
-        value_list = self.df_filled.iloc[row_index].values[top_filter]
-        labels = self.df_filled.columns[top_filter]
-        normalized_numbers = self.normalized_numbers_of_first_column[row_index]
-        first_column_bar_index = 0
+        # 获取一帧的布局数据
+        frame_slice = self.frame_plan.get_frame_slice(row_index)
+        rank_list = self.frame_plan.rank_values[frame_slice]
+        value_list = self.frame_plan.number_values[frame_slice]
+        number_labels = self.frame_plan.number_labels[frame_slice]
+        category_indices = self.frame_plan.category_indices[frame_slice]
+        labels = self.df_filled.columns[category_indices]
+        normalized_numbers = self.normalized_numbers_of_first_column[row_index, category_indices]
 
         for i_, (y_value, num_value) in enumerate(zip(rank_list, value_list)):
             x_value = (y_value + 0.5) // self.rows_in_column
@@ -921,22 +1487,17 @@ class DataVideoGenerator:
 
             if x_value == 0:
                 row_bar = Rectangle(
-                    (self.grid_bar_x_position, y_value - self.bar_height / 2), normalized_numbers[first_column_bar_index],
+                    (self.grid_bar_x_position, y_value - self.bar_height / 2), normalized_numbers[i_],
                     self.bar_height, linewidth=1, color=self.bar_colors[category_name], alpha=self.bar_alpha
                 )
-                first_column_bar_index += 1
                 self.ax.add_patch(row_bar)
             else:
                 x_value = self.grid_column_x_position_list[int(x_value)]
 
-            self.ax.annotate(category_name, (x_value, y_value),
-                             xytext=(self.category_x_offset, 0),
-                             xycoords='data', textcoords='offset points', fontsize=self.chart_category_font_size,
-                             va="center", color=self.chart_category_color, ha="right")
+            self._draw_grid_category_label(category_name, x_value, y_value)
 
             if self.chart_category_icon_position is not ChartCategoryIconPosition.HIDE:
-                img = OffsetImage(self.category_images[category_name], zoom=self.chart_category_icon_zoom)
-                img.image.axes = self.ax
+                img = self._get_category_offset_image(category_name)
 
                 # 图片
                 ab = AnnotationBbox(img, (x_value + self.icon_x_offset, y_value), xybox=(0, 0), frameon=False,
@@ -951,28 +1512,129 @@ class DataVideoGenerator:
 
             if float(num_value) < 0:
                 # 数字
-                self.ax.text(x_value + self.number_x_offset, y_value + self.number_y_offset, self.na_value_display_text,
-                             ha='left',
-                             size=self.chart_number_font_size, weight=self.number_font_weight,
-                             va='center', color=self.chart_number_color)
+                self._draw_grid_number(self.na_value_display_text, x_value + self.number_x_offset,
+                                       y_value + self.number_y_offset, is_na_value=True)
             else:
-                self.ax.text(x_value + self.number_x_offset, y_value + self.number_y_offset,
-                             self.number_format.format(x=num_value), ha='left',
-                             size=self.chart_number_font_size, weight=self.number_font_weight,
-                             va='center', color=self.chart_number_color, fontname=self.number_font_name)
+                self._draw_grid_number(number_labels[i_], x_value + self.number_x_offset, y_value + self.number_y_offset)
 
         # 时间
-        data_time = self.df_filled.index[row_index]
-        self.ax.text(self.time_x_position, self.time_y_position, data_time, transform=self.fig.transFigure,
-                     size=self.chart_time_font_size, ha='right', color=self.chart_time_color, weight='1000',
-                     family='monospace', fontname=self.time_font_name)
+        self._draw_time_text(self.frame_plan.time_labels[row_index])
 
         self._optimise_ax()
 
+    def _init_grid_chart_artists(self):
+        self._init_ax()
+
+        # 每个格子的artist只创建一次，排名过渡时可见的种类数量可能超过chart_top_n
+        slot_count = int(np.diff(self.frame_plan.frame_offsets).max(initial=0))
+        icon_zoom = 72 / self.video_dpi if self.presample_category_icons else self.chart_category_icon_zoom
+        self.grid_slot_artists = []
+        for _ in range(slot_count):
+            artists = {}
+            if self.chart_type is ChartType.GRID_AND_BAR:
+                artists['bar'] = self.ax.add_patch(Rectangle((self.grid_bar_x_position, 0), 0, self.bar_height, linewidth=1,
+                                                             alpha=self.bar_alpha))
+            artists['label'] = self._draw_grid_category_label('', 0, 0)
+            if self.chart_category_icon_position is not ChartCategoryIconPosition.HIDE:
+                img = OffsetImage(np.zeros((1, 1, 4)), zoom=icon_zoom)
+                img.image.axes = self.ax
+                artists['icon'] = self.ax.add_artist(AnnotationBbox(img, (0, 0), xybox=(0, 0), frameon=False,
+                                                                    xycoords='data', boxcoords='offset points', pad=0))
+            artists['number'] = self._draw_grid_number('', 0, 0)
+            artists['na_number'] = self._draw_grid_number(self.na_value_display_text, 0, 0, is_na_value=True)
+            for artist in artists.values():
+                artist.set_visible(False)
+            self.grid_slot_artists.append(artists)
+        self.grid_visible_slot_count = 0
+
+        self.time_label_artist = self._draw_time_text(self.frame_plan.time_labels[0])
+        self._optimise_ax()
+
+        self.animated_artists = [artist for artists in self.grid_slot_artists for artist in artists.values()]
+        self.animated_artists.append(self.time_label_artist)
+
+    # 与grid_chart_update和grid_and_bar_chart_update的画面一致，但只更新每个格子已有的artist
+    def grid_chart_retained_update(self, row_index):
+        frame_slice = self.frame_plan.get_frame_slice(row_index)
+        rank_list = self.frame_plan.rank_values[frame_slice]
+        value_list = self.frame_plan.number_values[frame_slice]
+        number_labels = self.frame_plan.number_labels[frame_slice]
+        category_indices = self.frame_plan.category_indices[frame_slice]
+        labels = self.df_filled.columns[category_indices]
+        if self.chart_type is ChartType.GRID_AND_BAR:
+            normalized_numbers = self.normalized_numbers_of_first_column[row_index, category_indices]
+
+        # 隐藏上一帧多出来的格子
+        for artists in self.grid_slot_artists[len(rank_list):self.grid_visible_slot_count]:
+            for artist in artists.values():
+                artist.set_visible(False)
+        self.grid_visible_slot_count = len(rank_list)
+
+        for i_, (rank_value, num_value) in enumerate(zip(rank_list, value_list)):
+            artists = self.grid_slot_artists[i_]
+            category_name = labels[i_]
+            column = (rank_value + 0.5) // self.rows_in_column
+            y_value = self.rows_in_column * (column + 1) - rank_value
+            x_value = column
+            number_x_offset = self.number_x_offset
+
+            if self.chart_type is ChartType.GRID_AND_BAR:
+                bar = artists['bar']
+                if column == 0:
+                    bar.set_y(y_value - self.bar_height / 2)
+                    bar.set_width(normalized_numbers[i_])
+                    bar.set_color(self.bar_colors[category_name])
+                    bar.set_visible(True)
+                else:
+                    bar.set_visible(False)
+                    x_value = self.grid_column_x_position_list[int(column)]
+            elif category_name in ['内蒙古', '黑龙江']:
+                number_x_offset = self.number_x_offset + 0.1
+
+            # 类别
+            artists['label'].set_text(category_name)
+            artists['label'].xy = (x_value, y_value)
+            artists['label'].set_visible(True)
+
+            # 图片，没有icon的种类不显示
+            if 'icon' in artists:
+                icon = artists['icon']
+                if category_name in self.category_images:
+                    icon.offsetbox.set_data(self.category_images[category_name])
+                    icon.xy = (x_value + self.icon_x_offset, y_value)
+                    icon.set_visible(True)
+                else:
+                    icon.set_visible(False)
+
+            # 数字
+            is_na_value = float(num_value) < 0
+            number = artists['na_number'] if is_na_value else artists['number']
+            if not is_na_value:
+                number.set_text(number_labels[i_])
+            number.set_position((x_value + number_x_offset, y_value + self.number_y_offset))
+            number.set_visible(True)
+            (artists['number'] if is_na_value else artists['na_number']).set_visible(False)
+
+        # 时间
+        self.time_label_artist.set_text(self.frame_plan.time_labels[row_index])
+        return self.animated_artists
+
     def generate_rank_background(self):
         if self.chart_type not in [ChartType.GRID, ChartType.GRID_AND_BAR]:
             print('chart type is not supported')
             return
+        self._draw_rank_numbers()
+        self.background_image_path = f"{self.output_dir}/排名背景.png"
+        plt.savefig(self.background_image_path, dpi=self.video_dpi, transparent=True)
+
+    # 与generate_rank_background相同的图片，不保存到磁盘，返回uint8 RGBA数组
+    def render_rank_background(self):
+        self._draw_rank_numbers()
+        with self._transparent_patches():
+            self.fig.canvas.draw()
+        return np.array(self.fig.canvas.buffer_rgba())
+
+    def _draw_rank_numbers(self):
         self._init_ax()
 
         for i in range(0, self.chart_top_n):
@@ -985,34 +1647,386 @@ class DataVideoGenerator:
 
         self._optimise_ax()
 
-        self.background_image_path = f"{self.output_dir}/排名背景.png"
-        plt.savefig(self.background_image_path, dpi=self.video_dpi, transparent=True)
+    # 与savefig(transparent=True)一致：绘制时figure和坐标轴的背景透明
+    @contextmanager
+    def _transparent_patches(self):
+        patches = [self.fig.patch, self.ax.patch]
+        colors = [(patch.get_facecolor(), patch.get_edgecolor()) for patch in patches]
+        for patch in patches:
+            patch.set_facecolor('none')
+            patch.set_edgecolor('none')
+        try:
+            yield
+        finally:
+            for patch, (facecolor, edgecolor) in zip(patches, colors):
+                patch.set_facecolor(facecolor)
+                patch.set_edgecolor(edgecolor)
+
+    def _get_frame_plan_key(self, colors):
+        hasher = hashlib.sha1()
+        for df in [self.df_filled, self.df_rank_filled]:
+            hasher.update(np.ascontiguousarray(df.values).tobytes())
+            hasher.update(repr(df.columns.tolist()).encode())
+            hasher.update(repr(df.index.tolist()).encode())
+        if self.show_value_change_indicator:
+            hasher.update(np.ascontiguousarray(self.value_changed).tobytes())
+        params = [self.chart_type, self.chart_top_n, self.number_format, self.date_time_format, colors]
+        hasher.update(repr(params).encode())
+        return hasher.hexdigest()
+
+    # 在渲染之前一次性计算所有帧的布局数据：可见种类、位置、数值、颜色和格式化之后的文字
+    def _prepare_frame_plan(self):
+        if self.chart_type not in [ChartType.H_BAR, ChartType.V_BAR, ChartType.GRID, ChartType.GRID_AND_BAR]:
+            self.frame_plan = None
+            return
+
+        if self.bar_color_type is BarColorType.SINGLE_COLOR:
+            category_colors = [self.bar_color] * self.df_filled.shape[1]
+        else:
+            category_colors = [self.bar_colors.get(category) for category in self.df_filled.columns]
+        colors = sorted(set(color for color in category_colors if color))
+        color_indices = {color: i for i, color in enumerate(colors)}
+        category_color_indices = [color_indices.get(color, -1) for color in category_colors]
+
+        frame_plan_key = self._get_frame_plan_key(colors)
+        frame_plan_path = f"{self.output_dir}/帧数据.npz"
+        if self.cache_frame_plan and os.path.exists(frame_plan_path):
+            frame_plan = FramePlan.load(frame_plan_path)
+            if frame_plan.key == frame_plan_key:
+                self.frame_plan = frame_plan
+                return
+
+        if self.chart_type in [ChartType.V_BAR, ChartType.GRID_AND_BAR]:
+            time_labels = [str(time_label) for time_label in self.df_filled.index]
+        else:
+            formatted_time_labels = {}
+            for time_label in self.df_filled.index.unique():
+                formatted_time_labels[time_label] = self._get_time_label(str(time_label))
+            time_labels = [formatted_time_labels[time_label] for time_label in self.df_filled.index]
+
+        self.frame_plan = FramePlan.build(
+            self.df_rank_filled.values, self.df_filled.values, self.chart_top_n,
+            category_color_indices, colors, lambda x: self.number_format.format(x=x), time_labels,
+            change_matrix=self.value_changed if self.show_value_change_indicator else None, key=frame_plan_key
+        )
+        if self.cache_frame_plan:
+            self.frame_plan.save(frame_plan_path)
 
     def generate(self):
-        self._adjust_category_images_params()
+        warm_up_fonts([self.category_font_name, self.time_font_name, self.number_font_name])
+        with self.profiler.phase('icons'):
+            self._adjust_category_images_params()
+        with self.profiler.phase('frame_plan'):
+            self._prepare_frame_plan()
+        self.profiler.set_frame_count(self.frame_count)
 
         print(f"视频帧数：{self.frame_count}, 视频总时长：{self.video_duration}秒")
         if self.is_preview_mode and self.preview_frame_count <= 0:
-            self.set_figure_background()
-            row_index = list(range(0, len(self.df_filled)))[self.preview_frame_index]
-            self.update_method(row_index)
-            plt.savefig(self.video_save_path, dpi=self.video_dpi, transparent=True)
+            with self.profiler.phase('background'):
+                self.set_figure_background()
+            with self.profiler.phase('render'):
+                if self.init_method:
+                    self.init_method()
+                row_index = self.frame_row_indices[self.preview_frame_index]
+                self.update_method(row_index)
+                plt.savefig(self.video_save_path, dpi=self.video_dpi, transparent=True)
+            if self.enable_profiling:
+                self._save_profile_report()
             return
 
         if self.progress_callback is None:
             self.progress_callback = self.show_progress
 
         start = time.time()
-        self.set_figure_background()
-        animator = animation.FuncAnimation(fig=self.fig, func=self.update_method, frames=self.frame_count,
-                                           interval=self.frame_interval)
-        animator.save(self.video_save_path, dpi=self.video_dpi, progress_callback=self.progress_callback,
-                      savefig_kwargs={'transparent': True})
+        # 排名背景图片需要在子进程开始渲染之前生成，避免多个进程同时写入
+        with self.profiler.phase('background'):
+            self.set_figure_background()
+        with self.profiler.phase('render'):
+            if self.incremental_render:
+                self._generate_incrementally()
+            elif self.render_process_count > 1:
+                self._generate_in_parallel()
+            else:
+                self._render_frames(range(self.frame_count), self.video_save_path, self.progress_callback)
         end = time.time()
         print(f'\n用时：{round(end - start)}秒')
         print(f"视频帧数：{self.frame_count}, 视频总时长：{self.video_duration}秒")
+        if self.enable_profiling:
+            self._save_profile_report()
+
+    def _save_profile_report(self):
+        options = {
+            name: getattr(self, name) for name in [
+                'is_preview_mode', 'chart_category_icon_position', 'presample_category_icons', 'show_category_bbox',
+                'show_value_change_indicator', 'show_champion_images', 'enable_retained_rendering', 'video_writer_type',
+                'render_process_count', 'incremental_render', 'virtual_hold_frames', 'lazy_preview_frames',
+                'composite_static_layer',
+            ]
+        }
+        report_path = f"{self.output_dir}/{PROFILE_REPORT_FILE_NAME}"
+        self.profiler.save(report_path, {
+            'chart_type': self.chart_type.name,
+            'options': {name: value.name if isinstance(value, Enum) else value for name, value in options.items()},
+            'frame_count': self.frame_count,
+            'category_count': self.df_filled.shape[1],
+            'data_row_count': self.df_filled.shape[0],
+        })
+        print(f"性能分析报告：{report_path}")
+
+    def _get_frame_segments(self, segment_count):
+        segment_size = math.ceil(self.frame_count / segment_count)
+        return [range(i, min(i + segment_size, self.frame_count)) for i in range(0, self.frame_count, segment_size)]
+
+    def _generate_in_parallel(self):
+        segments_dir = f"{self.output_dir}/视频片段"
+        os.makedirs(segments_dir, exist_ok=True)
+        frame_segments = self._get_frame_segments(self.render_process_count)
+        segment_paths = [f"{segments_dir}/{i:04d}.mp4" for i in range(len(frame_segments))]
+        self._render_segments_in_parallel(frame_segments, segment_paths)
+        with self.profiler.phase('concat'):
+            self._concat_video_segments(segment_paths, self.video_save_path)
+        shutil.rmtree(segments_dir)
+
+    # 片段文件名为片段输入的hash，输入不变的片段直接使用上次渲染的结果
+    def _generate_incrementally(self):
+        segments_dir = f"{self.output_dir}/视频片段缓存"
+        os.makedirs(segments_dir, exist_ok=True)
+        segment_frame_count = self.incremental_segment_frame_count
+        frame_segments = [
+            range(i, min(i + segment_frame_count, self.frame_count)) for i in range(0, self.frame_count, segment_frame_count)
+        ]
+        segment_paths = [f"{segments_dir}/{key}.mp4" for key in self._get_segment_keys(frame_segments)]
+
+        changed_segments = [
+            (frame_segment, segment_path) for frame_segment, segment_path in zip(frame_segments, segment_paths)
+            if not os.path.exists(segment_path)
+        ]
+        print(f"需要渲染的片段：{len(changed_segments)}/{len(frame_segments)}")
+        if changed_segments:
+            # 先写入临时文件，渲染中断时不会留下不完整的片段
+            temp_paths = [f"{segment_path[:-len('.mp4')]}.tmp.mp4" for _, segment_path in changed_segments]
+            changed_frame_segments = [frame_segment for frame_segment, _ in changed_segments]
+            if self.render_process_count > 1:
+                self._render_segments_in_parallel(changed_frame_segments, temp_paths)
+            else:
+                rendered_frame_count = 0
+                total_frame_count = sum(len(frame_segment) for frame_segment in changed_frame_segments)
+                for frame_segment, temp_path in zip(changed_frame_segments, temp_paths):
+                    self.render_segment(frame_segment, temp_path)
+                    rendered_frame_count += len(frame_segment)
+                    self.progress_callback(rendered_frame_count, total_frame_count)
+            for temp_path, (_, segment_path) in zip(temp_paths, changed_segments):
+                os.replace(temp_path, segment_path)
+
+        with self.profiler.phase('concat'):
+            self._concat_video_segments(segment_paths, self.video_save_path)
+        # 删除不再使用的片段
+        for file in os.listdir(segments_dir):
+            if f"{segments_dir}/{file}" not in segment_paths:
+                os.remove(f"{segments_dir}/{file}")
+
+    # 影响渲染结果、但不包括在数据中的参数
+    def _get_style_params(self):
+        excluded_params = {
+            'csv_path', 'output_dir', 'progress_callback', 'is_preview_mode', 'preview_frame_count', 'preview_frame_index',
+            'render_process_count', 'cache_frame_plan', 'cache_prepared_data', 'prepared_data_cache_dir', 'icon_cache_dir',
+            'virtual_hold_frames', 'lazy_preview_frames', 'incremental_render', 'enable_profiling',
+            'profile_sample_frame_count', 'text_raster_cache_size',
+        }
+        params = {field.name: getattr(self, field.name) for field in fields(self) if field.name not in excluded_params}
+        # 根据所有帧的数据计算出的参数
+        params['bar_colors'] = sorted(self.bar_colors.items()) if isinstance(self.bar_colors, dict) else self.bar_colors
+        params['xlim'] = [getattr(self, 'min_xlim', None), getattr(self, 'max_xlim', None)]
+        params['matplotlib_version'] = matplotlib.__version__
+        module_dir = os.path.dirname(os.path.abspath(__file__))
+        params['code_hash'] = [get_file_hash(f"{module_dir}/{file}") for file in RENDERING_MODULE_FILES]
+
+        # 图片文件的内容
+        file_signatures = []
+        for path in [self.background_image_path, self.top_categories_group_file]:
+            if path and os.path.isfile(path):
+                file_signatures.append((path, get_file_hash(path)))
+        for images_dir in [self.category_icons_dir, self.champion_images_dir]:
+            if images_dir and os.path.isdir(images_dir):
+                for file in sorted(os.listdir(images_dir)):
+                    stat = os.stat(f"{images_dir}/{file}")
+                    file_signatures.append((file, stat.st_mtime_ns, stat.st_size))
+        params['files'] = file_signatures
+        return params
+
+    # 每个片段的hash：样式参数以及该片段中每一帧的数据，折线图的每一帧还会显示之前所有帧的数据
+    def _get_segment_keys(self, frame_segments):
+        style_hasher = hashlib.sha1(repr(sorted(self._get_style_params().items())).encode())
+        matrices = [np.ascontiguousarray(self.df_filled.values), np.ascontiguousarray(self.df_rank_filled.values)]
+        if self.show_value_change_indicator:
+            matrices.append(self.value_changed)
+        style_hasher.update(repr(self.df_filled.columns.tolist()).encode())
+        time_labels = self.df_filled.index.astype(str)
+
+        segment_keys = []
+        for frame_segment in frame_segments:
+            hasher = style_hasher.copy()
+            row_indices = self.frame_row_indices[frame_segment.start:frame_segment.stop]
+            hasher.update(row_indices.astype(np.int64).tobytes())
+            first_row = 0 if self.chart_type is ChartType.LINE_CHART else row_indices.min()
+            rows = slice(first_row, row_indices.max() + 1)
+            for matrix in matrices:
+                hasher.update(matrix[rows].tobytes())
+            hasher.update(repr(time_labels[rows].tolist()).encode())
+            segment_keys.append(hasher.hexdigest())
+        return segment_keys
+
+    def _render_segments_in_parallel(self, frame_segments, segment_paths):
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        # 进度回调可能引用了无法pickle的对象（例如gui中的Process），子进程中不需要
+        segment_generator = copy.copy(self)
+        segment_generator.progress_callback = None
+        segment_generator.profiler = self.profiler.fork()
+        # figure（包括背景图片）和已创建的OffsetImage不发送给子进程，由render_segment重新创建
+        segment_generator.fig = segment_generator.ax = None
+        segment_generator.category_offset_images = {}
+        segment_generator.champion_offset_images = {}
+        # 绑定方法需要重新绑定到副本上，否则pickle时仍然会引用原对象
+        for method_name in ['update_method', 'init_method']:
+            method = getattr(self, method_name)
+            if method:
+                setattr(segment_generator, method_name, getattr(segment_generator, method.__name__))
+
+        rendered_frame_count = 0
+        total_frame_count = sum(len(frame_segment) for frame_segment in frame_segments)
+        with ProcessPoolExecutor(max_workers=self.render_process_count) as executor:
+            futures = {
+                executor.submit(_render_video_segment, segment_generator, frame_segment, segment_path): frame_segment
+                for frame_segment, segment_path in zip(frame_segments, segment_paths)
+            }
+            for future in as_completed(futures):
+                self.profiler.merge_state(future.result())
+                rendered_frame_count += len(futures[future])
+                self.progress_callback(rendered_frame_count, total_frame_count)
+
+    # 在子进程中执行，每个进程使用自己的figure渲染一段连续的帧
+    def render_segment(self, frame_segment, segment_path):
+        self.fig, self.ax = plt.subplots(figsize=self.video_aspect_ratio, dpi=self.video_dpi)
+        # 已创建的OffsetImage属于原来的figure
+        self.category_offset_images = {}
+        self.champion_offset_images = {}
+        self.set_figure_background()
+        self._render_frames(frame_segment, segment_path)
+        plt.close(self.fig)
+        return self.profiler.get_state()
+
+    def _render_frames(self, frames, save_path, progress_callback=None):
+        if self.init_method:
+            self.init_method()
+        if self.video_writer_type is VideoWriterType.RAW_PIPE:
+            self._render_frames_to_pipe(frames, save_path, progress_callback)
+        else:
+            self._render_frames_with_animation(frames, save_path, progress_callback)
+
+    # frames是视频中的帧号，更新方法的参数是数据行
+    def _render_frames_with_animation(self, frames, save_path, progress_callback=None):
+        import matplotlib.animation as animation
+        # 绘制和编码由animation完成，每一帧从更新结束到保存完成的时间记为绘制时间
+        next_frame_number = [frames.start]
+        updated_frame = []
+
+        def update_frame(row_index):
+            # 第一帧会在初始化时额外更新一次
+            self.profiler.start_frame(next_frame_number[0])
+            update_start = time.perf_counter()
+            artists = self.update_method(row_index)
+            update_end = time.perf_counter()
+            updated_frame[:] = [update_end - update_start, update_end]
+            return artists
+
+        def on_frame_saved(i, n):
+            if updated_frame:
+                update_time, update_end = updated_frame
+                self.profiler.end_frame(update_time, time.perf_counter() - update_end, None, self._count_artists())
+                updated_frame.clear()
+            next_frame_number[0] += 1
+            if progress_callback:
+                progress_callback(i, n)
+
+        animator = animation.FuncAnimation(fig=self.fig, func=update_frame,
+                                           frames=self.frame_row_indices[frames.start:frames.stop].tolist(),
+                                           interval=self.frame_interval, blit=self._is_blit_supported())
+        animator.save(save_path, dpi=self.video_dpi, progress_callback=on_frame_saved,
+                      savefig_kwargs={'transparent': True})
+
+    def _render_frames_to_pipe(self, frames, save_path, progress_callback=None):
+        # 与savefig(transparent=True)的效果一致
+        self.fig.set_facecolor('none')
+        self.ax.set_facecolor('none')
+
+        draw_times = []
+        encode_times = []
+        frame_size = self.fig.canvas.get_width_height()
+        static_layer = self._render_static_layer() if self.composite_static_layer else None
+        with RawVideoPipeWriter(save_path, frame_size, 1000 / self.frame_interval, preset=self.video_encoder_preset,
+                                crf=self.video_crf, pixel_format=self.video_pixel_format) as writer:
+            for i, frame_number in enumerate(frames):
+                self.profiler.start_frame(frame_number)
+                update_start = time.perf_counter()
+                self.update_method(int(self.frame_row_indices[frame_number]))
+                draw_start = time.perf_counter()
+                if static_layer is None:
+                    self.fig.canvas.draw()
+                else:
+                    self._draw_over_static_layer(static_layer)
+                encode_start = time.perf_counter()
+                writer.write_frame(self.fig.canvas.buffer_rgba())
+                encode_end = time.perf_counter()
+
+                self.profiler.end_frame(draw_start - update_start, encode_start - draw_start, encode_end - encode_start,
+                                        self._count_artists())
+                draw_times.append(encode_start - update_start)
+                encode_times.append(encode_end - encode_start)
+                if progress_callback:
+                    progress_callback(i, len(frames))
+
+        if draw_times:
+            print(f"\n每帧平均绘制用时：{np.mean(draw_times) * 1000:.1f}毫秒，"
+                  f"编码用时：{np.mean(encode_times) * 1000:.1f}毫秒")
+
+    # 只绘制figure背景和figimage（背景图片、排名背景），坐标轴中的内容每一帧都会变化
+    def _render_static_layer(self):
+        self.ax.set_visible(False)
+        try:
+            self.fig.canvas.draw()
+        finally:
+            self.ax.set_visible(True)
+        return self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+    # 与fig.canvas.draw()的结果一致：坐标轴在figimage之上，网格、刻度和边框随坐标轴范围变化，属于动态图层
+    def _draw_over_static_layer(self, static_layer):
+        self.fig.canvas.restore_region(static_layer)
+        self.ax.draw(self.fig.canvas.get_renderer())
+
+    def _count_artists(self):
+        return len(self.ax.get_children())
+
+    # 使用ffmpeg concat demuxer拼接，不重新编码
+    @staticmethod
+    def _concat_video_segments(segment_paths, save_path):
+        segment_list_path = f"{os.path.dirname(segment_paths[0])}/segments.txt"
+        with open(segment_list_path, 'w') as f:
+            for segment_path in segment_paths:
+                f.write(f"file '{os.path.abspath(segment_path)}'\n")
+        subprocess.run([
+            matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+            '-i', segment_list_path, '-c', 'copy', save_path
+        ], check=True)
+
+    # 坐标轴刻度会随着x轴范围变化，因此显示网格时不能使用blit，折线图的纵轴刻度也会变化
+    def _is_blit_supported(self):
+        return self.init_method is not None and not self.is_show_grid and self.chart_type is not ChartType.LINE_CHART
 
     @staticmethod
     def show_progress(i, n):
         print(f'正在合成视频：{round(i / n * 100, 2)}%', end="\r", flush=True)
         time.sleep(0.01)
+
+
+def _render_video_segment(generator, frame_segment, segment_path):
+    return generator.render_segment(frame_segment, segment_path)
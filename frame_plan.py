@@ -0,0 +1,68 @@
+import numpy as np
+from dataclasses import dataclass, fields
+
+
+@dataclass
+class FramePlan:
+    """所有帧的布局数据，渲染时只需要按帧截取
+
+    每一帧可见的种类数量不同，因此将所有帧的数据拼接成一维数组，
+    第row_index帧的数据位于[frame_offsets[row_index], frame_offsets[row_index + 1])
+    """
+    frame_offsets: np.ndarray
+    # 可见种类在表格中的列下标
+    category_indices: np.ndarray
+    rank_values: np.ndarray
+    y_values: np.ndarray
+    number_values: np.ndarray
+    number_labels: np.ndarray
+    # 每个种类的颜色在colors中的下标，-1表示没有颜色
+    category_color_indices: np.ndarray
+    colors: np.ndarray
+    time_labels: np.ndarray
+    # 可见种类的数值变化方向（int8：1上升，-1下降，0不变），不显示变化指示时为空数组
+    change_indicators: np.ndarray = None
+    # 生成数据的输入参数的hash，用于判断缓存是否可用
+    key: str = ''
+
+    @classmethod
+    def build(cls, rank_matrix, value_matrix, top_n, category_color_indices, colors, number_formatter, time_labels,
+              change_matrix=None, key=''):
+        top_filter = (rank_matrix >= 0) & (rank_matrix < top_n)
+        # 按行展开，每一帧内种类的次序与表格列的次序一致
+        frame_indices, category_indices = np.nonzero(top_filter)
+        frame_offsets = np.zeros(len(rank_matrix) + 1, dtype=np.int64)
+        np.cumsum(top_filter.sum(axis=1), out=frame_offsets[1:])
+
+        rank_values = rank_matrix[frame_indices, category_indices]
+        number_values = value_matrix[frame_indices, category_indices]
+        return cls(
+            frame_offsets=frame_offsets,
+            category_indices=category_indices.astype(np.int32),
+            rank_values=rank_values,
+            y_values=top_n - rank_values,
+            number_values=number_values,
+            number_labels=np.array([number_formatter(x) for x in number_values.tolist()], dtype=str),
+            category_color_indices=np.asarray(category_color_indices, dtype=np.int32),
+            colors=np.array(colors, dtype=str),
+            time_labels=np.array(time_labels, dtype=str),
+            change_indicators=np.zeros(0, dtype=np.int8) if change_matrix is None else change_matrix[frame_indices, category_indices],
+            key=key,
+        )
+
+    def get_frame_slice(self, row_index):
+        return slice(self.frame_offsets[row_index], self.frame_offsets[row_index + 1])
+
+    def get_frame_colors(self, frame_slice):
+        return self.colors[self.category_color_indices[self.category_indices[frame_slice]]].tolist()
+
+    def save(self, path):
+        np.savez(path, **{f.name: getattr(self, f.name) for f in fields(self)})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            # 旧版本的缓存中没有的字段使用默认值，key不同，不会被使用
+            params = {f.name: data[f.name] for f in fields(cls) if f.name in data}
+        params['key'] = str(params['key'])
+        return cls(**params)
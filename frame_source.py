@@ -0,0 +1,190 @@
+import numpy as np
+
+
+class FrameSource:
+    """按帧计算插值之后的数值和排名，不需要展开整个表格
+
+    第frame_index帧的数据只取决于相邻的两行原始数据，与fill_csv的结果一致：
+    开始和结束的定格帧分别对应第一行和最后一行，相邻两行之间有fill_steps帧
+    """
+
+    def __init__(self, data_frame, fill_steps, first_hold_count, last_hold_count, index_fill_method, interpolate=True):
+        self.columns = data_frame.columns
+        self.index_values = data_frame.index.values
+        self.source_values = data_frame.to_numpy(dtype=float)
+        self.fill_steps = fill_steps
+        self.first_hold_count = first_hold_count
+        # 'ffill'：插值帧显示前一行的时间，'bfill'：显示后一行的时间
+        self.index_fill_method = index_fill_method
+        self.interpolate = interpolate
+        self.expanded_row_count = (len(self.source_values) - 1) * fill_steps + 1
+        self.frame_count = first_hold_count + self.expanded_row_count + last_hold_count
+
+    def get_frames(self, frames):
+        expanded_rows = np.clip(np.asarray(frames) - self.first_hold_count, 0, self.expanded_row_count - 1)
+        left_rows, offsets = np.divmod(expanded_rows, self.fill_steps)
+        right_rows = np.minimum(left_rows + 1, len(self.source_values) - 1)
+
+        values = self.source_values[left_rows]
+        if self.interpolate:
+            # 与DataFrame.interpolate()（np.interp）的计算方式保持一致
+            slopes = (self.source_values[right_rows] - values) / self.fill_steps
+            values = np.where(offsets[:, None] > 0, slopes * offsets[:, None] + values, values)
+
+        if self.index_fill_method == 'bfill':
+            index_values = self.index_values[np.where(offsets > 0, right_rows, left_rows)]
+        else:
+            index_values = self.index_values[left_rows]
+        return index_values, values
+
+    def get_min_ranks(self, start_frame, top_n, na_value=None, chunk_size=1024):
+        """第start_frame帧及之后所有帧中每一列的最小排名（不包括排名过渡），数值等于na_value时排名为top_n
+
+        原始数据行的排名直接计算；两行之间插值时每一列的数值在两端的数值之间，
+        排名的下限为两端较小数值超过该列两端较大数值的列数，只有下限小于已知最小排名的数据段才需要逐帧计算
+        """
+        min_ranks = np.full(len(self.columns), float(top_n))
+        if start_frame >= self.frame_count:
+            return min_ranks
+        # 与get_frames一致，定格帧对应第一行或者最后一行，不插值时两行之间的帧与前一行相同
+        left_row, offset = divmod(min(max(start_frame - self.first_hold_count, 0), self.expanded_row_count - 1), self.fill_steps)
+        rows = np.arange(left_row if offset == 0 or not self.interpolate else left_row + 1, len(self.source_values))
+        for chunk_start in range(0, len(rows), chunk_size):
+            ranks = self._get_masked_ranks(self.source_values[rows[chunk_start:chunk_start + chunk_size]], top_n, na_value)
+            np.minimum(min_ranks, ranks.min(axis=0), out=min_ranks)
+        if not self.interpolate or self.fill_steps < 2:
+            return min_ranks
+
+        # 第segment段为第segment行到第segment + 1行之间的插值帧
+        source_frames = self.first_hold_count + np.arange(len(self.source_values)) * self.fill_steps
+        segments = np.arange(left_row, len(self.source_values) - 1)
+        column_count = len(self.columns)
+        for chunk_start in range(0, len(segments), chunk_size):
+            chunk = segments[chunk_start:chunk_start + chunk_size]
+            left, right = self.source_values[chunk], self.source_values[chunk + 1]
+            lower, upper = np.minimum(left, right), np.maximum(left, right)
+            # 降序排列，数值相同时upper在前，因此只统计严格大于upper的lower
+            order = np.argsort(-np.hstack([upper, lower]), axis=1, kind='stable')
+            lower_counts = np.cumsum(order >= column_count, axis=1)
+            rank_lower_bounds = np.empty(upper.shape)
+            is_upper = order < column_count
+            rank_lower_bounds[np.nonzero(is_upper)[0], order[is_upper]] = lower_counts[is_upper]
+            for segment in chunk[(rank_lower_bounds < min_ranks).any(axis=1)]:
+                frames = source_frames[segment] + np.arange(1, self.fill_steps)
+                ranks = self._get_masked_ranks(self.get_frames(frames[frames >= start_frame])[1], top_n, na_value)
+                np.minimum(min_ranks, ranks.min(axis=0, initial=top_n), out=min_ranks)
+        return min_ranks
+
+    @classmethod
+    def _get_masked_ranks(cls, values, top_n, na_value):
+        ranks = cls.get_ranks(values, top_n)
+        if na_value is not None:
+            ranks[values == na_value] = top_n
+        return ranks
+
+    @staticmethod
+    def get_ranks(values, top_n):
+        # 与DataFrame.rank(axis=1, method='first', ascending=False)一致：数值相同时表格列靠前的排名靠前
+        order = np.argsort(-values, axis=1, kind='stable')
+        ranks = np.empty(values.shape)
+        np.put_along_axis(ranks, order, np.arange(values.shape[1], dtype=float)[None, :], axis=1)
+        # rank范围：[0, top_n]，并且数值越小，排名越靠前
+        return np.minimum(ranks, top_n)
+
+
+class RankTransitionSmoother:
+    """排名动画自然过渡，可以分段依次处理，分段之间保留过渡状态
+
+    首先筛选出排名动画过渡起始时刻的排名数值，然后对这两个数值进行线性变化，将过渡过程中的排名数值一一替换即可
+    假设过渡动画帧数量为2，输入的某一列为:
+    [1,    1,    1,       1,       2,       2,        2]
+    输出为：
+    [1,    1,    1,       1,       1.3333,  1.66667,  2]
+    过渡期间再次发生的变化会被忽略，过渡结束之后再与过渡的终点数值比较
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        # 已处理的行数
+        self.row_offset = 0
+        self.previous_row = None
+        # 每一列的过渡终点数值和下一次比较的行号
+        self.last_rank = None
+        self.resume_index = None
+        # 延续到后面分段的过渡：(列, 起始行号, 起始数值, 终点数值)
+        self.pending_transitions = None
+
+    def smooth(self, value_matrix):
+        """value_matrix：ndarray，每一列单独处理，会被直接修改"""
+        steps = self.steps
+        row_count, column_count = value_matrix.shape
+        if steps < 2 or row_count == 0:
+            return value_matrix
+
+        row_offset = self.row_offset
+        self.row_offset += row_count
+        if self.last_rank is None:
+            self.last_rank = value_matrix[0].copy()
+            self.resume_index = np.zeros(column_count, dtype=int)
+            self.pending_transitions = tuple(np.zeros(0, dtype=dtype) for dtype in [int, int, float, float])
+
+        # next_change_index[i, c]：第c列从第i行开始（包括第i行）第一次与上一行不同的行号，没有则为row_count
+        # 行号都是分段内的行号，多出的最后一行用于查询row_count位置
+        row_index = np.arange(row_count + 1)[:, None]
+        is_changed = np.zeros((row_count + 1, column_count), dtype=bool)
+        is_changed[1:row_count] = np.diff(value_matrix, axis=0) != 0
+        if self.previous_row is not None:
+            is_changed[0] = value_matrix[0] != self.previous_row
+        self.previous_row = value_matrix[-1].copy()
+        next_change_index = np.where(is_changed, row_index, row_count)
+        next_change_index = np.minimum.accumulate(next_change_index[::-1], axis=0)[::-1]
+
+        # 每一轮找出所有列的下一次过渡，轮数等于单列过渡次数的最大值
+        transitions = [self.pending_transitions]
+        columns = np.arange(column_count)
+        resume_index = self.resume_index - row_offset
+        last_rank = self.last_rank
+        waiting = [(columns[:0], resume_index[:0], last_rank[:0])]
+        while len(columns):
+            # 下一次比较的行号在后面的分段中
+            is_waiting = resume_index >= row_count
+            waiting.append((columns[is_waiting], resume_index[is_waiting], last_rank[is_waiting]))
+            columns, resume_index, last_rank = columns[~is_waiting], resume_index[~is_waiting], last_rank[~is_waiting]
+
+            change_index = np.where(
+                value_matrix[resume_index, columns] != last_rank,
+                resume_index, next_change_index[resume_index + 1, columns]
+            )
+            # 该分段中没有变化，从下一个分段的第一行开始比较
+            is_active = change_index < row_count
+            waiting.append((columns[~is_active], np.full((~is_active).sum(), row_count), last_rank[~is_active]))
+            columns, change_index, last_rank = columns[is_active], change_index[is_active], last_rank[is_active]
+            current_rank = value_matrix[change_index, columns]
+            transitions.append((columns, change_index - 1 + row_offset, last_rank, current_rank))
+
+            last_rank = current_rank
+            resume_index = change_index - 1 + steps
+
+        waiting_columns, waiting_resume_index, waiting_last_rank = (np.concatenate(items) for items in zip(*waiting))
+        self.last_rank = np.empty(column_count)
+        self.last_rank[waiting_columns] = waiting_last_rank
+        self.resume_index = np.empty(column_count, dtype=int)
+        self.resume_index[waiting_columns] = waiting_resume_index + row_offset
+
+        columns, start_index, start_rank, end_rank = (np.concatenate(items) for items in zip(*transitions))
+        is_pending = start_index + steps > self.row_offset
+        self.pending_transitions = (columns[is_pending], start_index[is_pending], start_rank[is_pending], end_rank[is_pending])
+        if not len(columns):
+            return value_matrix
+
+        # 与np.linspace(start_rank, end_rank, num=steps)的计算方式保持一致
+        offsets = np.arange(steps, dtype=float)
+        transition_rank_matrix = offsets[None, :] * ((end_rank - start_rank) / (steps - 1))[:, None] + start_rank[:, None]
+        transition_rank_matrix[:, -1] = end_rank
+        # 将过渡期间的排名数值替换掉，相邻两次过渡只会在衔接处重叠，并且数值相同
+        # 过渡的起始行在前一个分段时，该行的数值本来就等于起始数值
+        transition_rows = start_index[:, None] + np.arange(steps)[None, :] - row_offset
+        transition_columns = np.broadcast_to(columns[:, None], transition_rows.shape)
+        is_in_range = (transition_rows >= 0) & (transition_rows < row_count)
+        value_matrix[transition_rows[is_in_range], transition_columns[is_in_range]] = transition_rank_matrix[is_in_range]
+        return value_matrix
@@ -1,8 +1,5 @@
 import wx
-from csv_generator import CSVGenerator
-from csv_util import remove_china_sar_data, merge_fao_data, merge_china_sar_data, merge_ethiopia_pdr_data, rename_china_province_name
-from chart_constants import CSVSource, ChartType, StatisticsTime, ChartCategoryIconPosition, CategoryLabelPosition, BarColorType, ProvinceNameType
-from data_video_generator import DataVideoGenerator
+from chart_constants import CSVSource, ChartType, StatisticsTime, ChartCategoryIconPosition, CategoryLabelPosition, BarColorType, ProvinceNameType, VideoWriterType
 import os
 import json
 from multiprocessing import Process, Manager
@@ -29,6 +26,7 @@ class TopCategoriesDialog(wx.Dialog):
     def _show_top_n(self, _):
         top_n = int(self.tc_top_n.GetValue().strip())
         if self.generator is None:
+            from data_video_generator import DataVideoGenerator
             self.generator = DataVideoGenerator(**self.params)
         total_categories = "\n".join(self.generator.get_total_top_categories(top_n))
         self.tc_result.SetValue(total_categories)
@@ -87,6 +85,11 @@ class CsvProcessFrame(wx.Frame):
         self.tc_year_range.SetHint('1961,2019')
         grid_sizer.Add(self.tc_year_range, flag=wx.EXPAND)
 
+        # 0表示一次性读取整个文件
+        grid_sizer.Add(wx.StaticText(self, label='分块读取行数'))
+        self.spin_read_chunk_size = wx.SpinCtrl(self, value="0", min=0, max=10 ** 8)
+        grid_sizer.Add(self.spin_read_chunk_size)
+
         grid_sizer.Add(wx.StaticText(self, label='输出文件'))
         self.fpc_output_csv = wx.FilePickerCtrl(self, style=wx.FLP_USE_TEXTCTRL | wx.FLP_SAVE, wildcard="csv文件|*.csv")
         grid_sizer.Add(self.fpc_output_csv, flag=wx.EXPAND)
@@ -146,12 +149,13 @@ class CsvProcessFrame(wx.Frame):
                 else:
                     year_list = None
             params['real_csv_path'] = self.fpc_output_csv.GetPath()
+            params['read_chunk_size'] = self.spin_read_chunk_size.GetValue() or None
 
+            from csv_generator import CSVGenerator
             csv_generator = CSVGenerator(**params)
-            csv_generator.generate(year_list=year_list, index_column=self.tc_index_column_name.GetValue().strip())
-
-            if self.chk_need_post_process.IsChecked():
-                csv_generator.process("post", self._csv_post_process, is_saving=True)
+            post_process_func = self._csv_post_process if self.chk_need_post_process.IsChecked() else None
+            csv_generator.generate(year_list=year_list, index_column=self.tc_index_column_name.GetValue().strip(),
+                                   post_process_func=post_process_func)
         finally:
             self.btn_process_csv.Enable(True)
 
@@ -162,6 +166,7 @@ class CsvProcessFrame(wx.Frame):
         os.popen(f"open -R {csv_file}").read()
 
     def _csv_post_process(self, df):
+        from csv_util import remove_china_sar_data, merge_fao_data, merge_china_sar_data, merge_ethiopia_pdr_data, rename_china_province_name
         if self.chk_remove_china_sar_data.IsChecked():
             df = remove_china_sar_data(df)
 
@@ -177,7 +182,7 @@ class CsvProcessFrame(wx.Frame):
 
         fao_file = self.fpc_fao_file_path.GetPath()
         if fao_file:
-            df = merge_fao_data(df, fao_file)
+            df = merge_fao_data(df, fao_file, self.spin_read_chunk_size.GetValue() or None)
 
         scale_ratio = self.tc_csv_value_scale_ratio.GetValue().strip()
         if scale_ratio:
@@ -216,7 +221,8 @@ class MainFrame(wx.Frame):
         main_sizer.SetSizeHints(self)
 
         self.config_dir = "gui_configs"
-        self.progress_container = Manager().dict()
+        # Manager会启动一个服务进程，第一次合成视频时再创建
+        self.progress_container = None
         self.progress_info_container = dict()
         self.config_file_info = dict()
 
@@ -254,6 +260,8 @@ class MainFrame(wx.Frame):
         self.cho_category_label_position.SetStringSelection(params.get('category_label_position', 'CategoryLabelPosition.RIGHT').split('.')[-1])
         self.spin_rows_in_column.SetValue(params.get('rows_in_column', 10))
         self.spin_change_indicator_x_offset.SetValue(params.get('change_indicator_x_offset', 0))
+        self.spin_change_indicator_look_ahead.SetValue(params.get('change_indicator_look_ahead', 1))
+        self.tc_change_indicator_dead_band.SetValue(str(params.get('change_indicator_dead_band', 0)))
         self.chk_is_preview_mode.SetValue(params.get('is_preview_mode', True))
         self.chk_is_show_grid.SetValue(params.get('is_show_grid', False))
         self.tc_tick_label_format.SetValue(params.get('tick_label_format', "{x:.0f}"))
@@ -314,6 +322,25 @@ class MainFrame(wx.Frame):
         self.spin_first_frame_duration.SetValue(params['first_frame_duration'])
         self.spin_last_frame_duration.SetValue(params['last_frame_duration'])
         self.chk_enable_category_value_interpolation.SetValue(params['enable_category_value_interpolation'])
+        self.chk_enable_retained_rendering.SetValue(params.get('enable_retained_rendering', False))
+        self.chk_decimate_line_chart.SetValue(params.get('decimate_line_chart', False))
+        self.chk_fast_text_rendering.SetValue(params.get('fast_text_rendering', False))
+        self.spin_text_raster_cache_size.SetValue(params.get('text_raster_cache_size', 2048))
+        self.chk_composite_static_layer.SetValue(params.get('composite_static_layer', False))
+        self.spin_render_process_count.SetValue(params.get('render_process_count', 1))
+        self.chk_cache_frame_plan.SetValue(params.get('cache_frame_plan', False))
+        self.chk_presample_category_icons.SetValue(params.get('presample_category_icons', False))
+        self.chk_cache_prepared_data.SetValue(params.get('cache_prepared_data', False))
+        self.chk_virtual_hold_frames.SetValue(params.get('virtual_hold_frames', False))
+        self.chk_lazy_preview_frames.SetValue(params.get('lazy_preview_frames', False))
+        self.chk_incremental_render.SetValue(params.get('incremental_render', False))
+        self.spin_incremental_segment_frame_count.SetValue(params.get('incremental_segment_frame_count', 250))
+        self.chk_enable_profiling.SetValue(params.get('enable_profiling', False))
+        self.spin_profile_sample_frame_count.SetValue(params.get('profile_sample_frame_count', 0))
+        self.cho_video_writer_type.SetStringSelection(params.get('video_writer_type', 'VideoWriterType.MATPLOTLIB').split('.')[-1])
+        self.tc_video_encoder_preset.SetValue(params.get('video_encoder_preset', 'medium'))
+        self.spin_video_crf.SetValue(params.get('video_crf', 23))
+        self.tc_video_pixel_format.SetValue(params.get('video_pixel_format', 'yuv420p'))
         self.chk_show_champion_images.SetValue(params.get('show_champion_images', False))
         self.dpc_champion_images_dir.SetPath(params.get('champion_images_dir', ''))
         self.tc_champion_image_position.SetValue(",".join(map(str,params.get('champion_image_position', [0, 0]))))
@@ -323,6 +350,11 @@ class MainFrame(wx.Frame):
         self.tc_bbox_line_width.SetValue(str(params.get('bbox_line_width', 2)))
         self.tc_bbox_x_offset.SetValue(str(params.get('bbox_x_offset', 0)))
 
+    def _get_progress_container(self):
+        if self.progress_container is None:
+            self.progress_container = Manager().dict()
+        return self.progress_container
+
     def _get_output_dir(self):
         return self.dpc_output_dir.GetPath()
 
@@ -335,7 +367,7 @@ class MainFrame(wx.Frame):
         self._load_video_generator_params(params)
 
     def _show_generation_progress_list(self, _):
-        VideoProgressListFrame(self.progress_container, self.progress_info_container).Show()
+        VideoProgressListFrame(self._get_progress_container(), self.progress_info_container).Show()
 
     def _open_csv_frame(self, _):
         CsvProcessFrame().Show()
@@ -412,6 +444,8 @@ class MainFrame(wx.Frame):
         params['category_label_position'] = CategoryLabelPosition[self.cho_category_label_position.GetStringSelection()]
         params['rows_in_column'] = self.spin_rows_in_column.GetValue()
         params['change_indicator_x_offset'] = self.spin_change_indicator_x_offset.GetValue()
+        params['change_indicator_look_ahead'] = self.spin_change_indicator_look_ahead.GetValue()
+        params['change_indicator_dead_band'] = float(self.tc_change_indicator_dead_band.GetValue().strip())
         params['is_preview_mode'] = self.chk_is_preview_mode.IsChecked()
         params['is_show_grid'] = self.chk_is_show_grid.IsChecked()
         params['show_value_change_indicator'] = self.chk_show_value_change_indicator.IsChecked()
@@ -474,6 +508,25 @@ class MainFrame(wx.Frame):
         params['first_frame_duration'] = self.spin_first_frame_duration.GetValue()
         params['last_frame_duration'] = self.spin_last_frame_duration.GetValue()
         params['enable_category_value_interpolation'] = self.chk_enable_category_value_interpolation.IsChecked()
+        params['enable_retained_rendering'] = self.chk_enable_retained_rendering.IsChecked()
+        params['decimate_line_chart'] = self.chk_decimate_line_chart.IsChecked()
+        params['fast_text_rendering'] = self.chk_fast_text_rendering.IsChecked()
+        params['text_raster_cache_size'] = self.spin_text_raster_cache_size.GetValue()
+        params['composite_static_layer'] = self.chk_composite_static_layer.IsChecked()
+        params['render_process_count'] = self.spin_render_process_count.GetValue()
+        params['cache_frame_plan'] = self.chk_cache_frame_plan.IsChecked()
+        params['presample_category_icons'] = self.chk_presample_category_icons.IsChecked()
+        params['cache_prepared_data'] = self.chk_cache_prepared_data.IsChecked()
+        params['virtual_hold_frames'] = self.chk_virtual_hold_frames.IsChecked()
+        params['lazy_preview_frames'] = self.chk_lazy_preview_frames.IsChecked()
+        params['incremental_render'] = self.chk_incremental_render.IsChecked()
+        params['incremental_segment_frame_count'] = self.spin_incremental_segment_frame_count.GetValue()
+        params['enable_profiling'] = self.chk_enable_profiling.IsChecked()
+        params['profile_sample_frame_count'] = self.spin_profile_sample_frame_count.GetValue()
+        params['video_writer_type'] = VideoWriterType[self.cho_video_writer_type.GetStringSelection()]
+        params['video_encoder_preset'] = self.tc_video_encoder_preset.GetValue().strip()
+        params['video_crf'] = self.spin_video_crf.GetValue()
+        params['video_pixel_format'] = self.tc_video_pixel_format.GetValue().strip()
         params['show_champion_images'] = self.chk_show_champion_images.IsChecked()
         params['champion_images_dir'] = self.dpc_champion_images_dir.GetPath()
         params['champion_image_zoom'] = float(self.tc_champion_image_zoom.GetValue().strip())
@@ -492,7 +545,7 @@ class MainFrame(wx.Frame):
         os.popen(f"open {output_dir}").read()
 
     def _start_video_generation(self, generator, index):
-        VideoGeneratorProcess(generator, index, self.progress_container).start()
+        VideoGeneratorProcess(generator, index, self._get_progress_container()).start()
 
     def _show_top_n(self, _):
         params = self._get_video_generator_params()
@@ -505,13 +558,15 @@ class MainFrame(wx.Frame):
             params = self._get_video_generator_params()
             with open(f"{self._get_output_dir()}/config.json", 'w') as file:
                 file.write(self._get_video_generator_params_as_json())
+            # pandas和matplotlib导入较慢，第一次合成视频时再导入，gui可以更快显示
+            from data_video_generator import DataVideoGenerator
             video_generator = DataVideoGenerator(**params)
 
             if video_generator.is_preview_mode:
                 video_generator.generate()
                 os.popen(f"open -R {video_generator.video_save_path}").read()
             else:
-                current_index = len(self.progress_container)
+                current_index = len(self._get_progress_container())
                 generator_thread = Thread(target=self._start_video_generation, args=(video_generator, current_index))
                 generator_thread.start()
                 self.progress_info_container[current_index] = {
@@ -568,6 +623,83 @@ class MainFrame(wx.Frame):
         self.chk_enable_category_value_interpolation.SetValue(True)
         grid_sizer.Add(self.chk_enable_category_value_interpolation)
 
+        grid_sizer.Add(wx.StaticText(pane_window, label='复用图形元素'))
+        self.chk_enable_retained_rendering = wx.CheckBox(pane_window)
+        grid_sizer.Add(self.chk_enable_retained_rendering)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='折线图降采样'))
+        self.chk_decimate_line_chart = wx.CheckBox(pane_window)
+        grid_sizer.Add(self.chk_decimate_line_chart)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='缓存文字图片'))
+        self.chk_fast_text_rendering = wx.CheckBox(pane_window)
+        grid_sizer.Add(self.chk_fast_text_rendering)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='文字图片缓存数量'))
+        self.spin_text_raster_cache_size = wx.SpinCtrl(pane_window, value="2048", min=16, max=100000)
+        grid_sizer.Add(self.spin_text_raster_cache_size)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='静态图层只绘制一次'))
+        self.chk_composite_static_layer = wx.CheckBox(pane_window)
+        grid_sizer.Add(self.chk_composite_static_layer)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='并行渲染进程数'))
+        self.spin_render_process_count = wx.SpinCtrl(pane_window, value="1", min=1, max=os.cpu_count())
+        grid_sizer.Add(self.spin_render_process_count)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='缓存帧数据'))
+        self.chk_cache_frame_plan = wx.CheckBox(pane_window)
+        grid_sizer.Add(self.chk_cache_frame_plan)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='预先缩放图标'))
+        self.chk_presample_category_icons = wx.CheckBox(pane_window)
+        grid_sizer.Add(self.chk_presample_category_icons)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='缓存预处理数据'))
+        self.chk_cache_prepared_data = wx.CheckBox(pane_window)
+        grid_sizer.Add(self.chk_cache_prepared_data)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='定格帧不复制数据'))
+        self.chk_virtual_hold_frames = wx.CheckBox(pane_window)
+        grid_sizer.Add(self.chk_virtual_hold_frames)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='预览时按需插值'))
+        self.chk_lazy_preview_frames = wx.CheckBox(pane_window)
+        grid_sizer.Add(self.chk_lazy_preview_frames)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='增量渲染'))
+        self.chk_incremental_render = wx.CheckBox(pane_window)
+        grid_sizer.Add(self.chk_incremental_render)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='增量渲染片段帧数'))
+        self.spin_incremental_segment_frame_count = wx.SpinCtrl(pane_window, value="250", min=10, max=10000)
+        grid_sizer.Add(self.spin_incremental_segment_frame_count)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='性能分析'))
+        self.chk_enable_profiling = wx.CheckBox(pane_window)
+        grid_sizer.Add(self.chk_enable_profiling)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='cProfile分析帧数'))
+        self.spin_profile_sample_frame_count = wx.SpinCtrl(pane_window, value="0", min=0, max=1000)
+        grid_sizer.Add(self.spin_profile_sample_frame_count)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='视频写入方式'))
+        self.cho_video_writer_type = wx.Choice(pane_window, choices=list(VideoWriterType.__members__.keys()))
+        self.cho_video_writer_type.SetSelection(0)
+        grid_sizer.Add(self.cho_video_writer_type)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='编码preset'))
+        self.tc_video_encoder_preset = wx.TextCtrl(pane_window, value="medium")
+        grid_sizer.Add(self.tc_video_encoder_preset)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='编码CRF'))
+        self.spin_video_crf = wx.SpinCtrl(pane_window, value="23", min=0, max=51)
+        grid_sizer.Add(self.spin_video_crf)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='编码像素格式'))
+        self.tc_video_pixel_format = wx.TextCtrl(pane_window, value="yuv420p")
+        grid_sizer.Add(self.tc_video_pixel_format)
+
         grid_sizer.Add(wx.StaticText(pane_window, label="条形图透明度"))
         self.tc_bar_alpha = wx.TextCtrl(pane_window, value="0.85")
         grid_sizer.Add(self.tc_bar_alpha)
@@ -936,6 +1068,14 @@ class MainFrame(wx.Frame):
         self.spin_change_indicator_x_offset = wx.SpinCtrl(pane_window, min=-100, max=1000)
         grid_sizer.Add(self.spin_change_indicator_x_offset)
 
+        grid_sizer.Add(wx.StaticText(pane_window, label='上升下降比较之后的帧数'))
+        self.spin_change_indicator_look_ahead = wx.SpinCtrl(pane_window, value="1", min=1, max=1000)
+        grid_sizer.Add(self.spin_change_indicator_look_ahead)
+
+        grid_sizer.Add(wx.StaticText(pane_window, label='上升下降忽略的变化幅度'))
+        self.tc_change_indicator_dead_band = wx.TextCtrl(pane_window, value="0")
+        grid_sizer.Add(self.tc_change_indicator_dead_band)
+
         pane_window.SetSizer(grid_sizer)
         grid_sizer.SetSizeHints(pane_window)
         pane_list.append(segment_pane)
@@ -0,0 +1,58 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+
+# 进程内缓存，同一个进程中的多个任务共享，文件修改之后缓存自动失效
+_decoded_images = {}
+_resized_images = {}
+
+
+def read_image(image_path):
+    key = (os.path.abspath(image_path), os.path.getmtime(image_path))
+    if key not in _decoded_images:
+        import matplotlib.pyplot as plt
+        _decoded_images[key] = plt.imread(image_path)
+    return _decoded_images[key]
+
+
+# 将图片缩放为OffsetImage(zoom=zoom)在dpi下显示的像素大小，渲染时不需要再次缩放
+# cache_dir不为空时，缩放之后的图片会保存在该目录中，供其它任务使用
+def read_resized_image(image_path, zoom, dpi, cache_dir=None):
+    key = (os.path.abspath(image_path), os.path.getmtime(image_path), zoom, dpi)
+    if key in _resized_images:
+        return _resized_images[key]
+
+    cache_path = None
+    if cache_dir:
+        cache_dir = os.path.expanduser(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path = f"{cache_dir}/{hashlib.sha1(repr(key).encode()).hexdigest()}.npy"
+        if os.path.exists(cache_path):
+            _resized_images[key] = np.load(cache_path)
+            return _resized_images[key]
+
+    from PIL import Image
+    image = read_image(image_path)
+    # png读取结果为0~1之间的浮点数
+    if image.dtype != np.uint8:
+        image = (image * 255).round().astype(np.uint8)
+    height, width = image.shape[:2]
+    scale = zoom * dpi / 72
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    resized_image = np.asarray(Image.fromarray(image).resize(size, Image.LANCZOS))
+
+    if cache_path:
+        # 先写入同一目录下的临时文件再替换，其它进程不会读到不完整的文件
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix='.', suffix='.npy')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, resized_image)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    _resized_images[key] = resized_image
+    return resized_image
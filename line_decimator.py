@@ -0,0 +1,54 @@
+import numpy as np
+
+
+class LineDecimator:
+    """折线图降采样，每条线绘制的点数取决于横轴的像素宽度，而不是数据行数
+
+    横轴的每个像素是一个分组，分组内只保留第一个点、最小值、最大值和最后一个点（M4），
+    绘制结果与绘制所有点基本一致，并且极值不会丢失
+    横轴范围是固定的，已经结束的分组的结果一次性计算，当前行所在的分组使用原始数据
+    """
+
+    def __init__(self, x_values, values, x_min, x_max, pixel_count):
+        """x_values：按时间排序的横轴数值，values：每一列是一条线"""
+        self.x_values = x_values
+        self.values = values
+        row_count, column_count = values.shape
+
+        # 横轴范围之外的点归入两端的分组
+        pixels = np.floor((x_values - x_min) / (x_max - x_min) * pixel_count)
+        pixels = np.clip(pixels, 0, pixel_count - 1)
+        self.group_starts = np.flatnonzero(np.r_[True, pixels[1:] != pixels[:-1]])
+        group_ends = np.r_[self.group_starts[1:], row_count]
+        self.group_count = len(self.group_starts)
+        # 每一行所在的分组
+        self.row_groups = np.repeat(np.arange(self.group_count), group_ends - self.group_starts)
+
+        # 每个分组中最小值和最大值第一次出现的行，忽略空值，全部为空值时取第一行
+        row_index = np.broadcast_to(np.arange(row_count)[:, None], values.shape)
+        group_rows = []
+        for reduce_function in [np.fmin, np.fmax]:
+            extreme_values = np.repeat(reduce_function.reduceat(values, self.group_starts, axis=0), group_ends - self.group_starts, axis=0)
+            extreme_rows = np.minimum.reduceat(np.where(values == extreme_values, row_index, row_count), self.group_starts, axis=0)
+            group_rows.append(np.where(extreme_rows < row_count, extreme_rows, self.group_starts[:, None]))
+        first_rows = np.broadcast_to(self.group_starts[:, None], group_rows[0].shape)
+        last_rows = np.broadcast_to(group_ends[:, None] - 1, group_rows[0].shape)
+        # (分组, 4, 列)，每个分组的点按行号排序
+        point_rows = np.sort(np.stack([first_rows, *group_rows, last_rows], axis=1), axis=1)
+        # 每一列保存为连续的数组：(列, 分组 * 4)
+        point_rows = point_rows.transpose(2, 0, 1).reshape(column_count, -1)
+        self.point_x_values = x_values[point_rows]
+        self.point_values = np.take_along_axis(values.T, point_rows, axis=1)
+
+    # 降采样之后点数明显减少时才需要使用
+    def is_effective(self):
+        return self.group_count * 4 < len(self.x_values)
+
+    def get_line(self, row_index, column):
+        """第0行到第row_index行的折线，返回(x, y)"""
+        group = self.row_groups[row_index]
+        start = self.group_starts[group]
+        point_count = group * 4
+        x = np.concatenate([self.point_x_values[column, :point_count], self.x_values[start:row_index + 1]])
+        y = np.concatenate([self.point_values[column, :point_count], self.values[start:row_index + 1, column]])
+        return x, y
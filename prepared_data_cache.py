@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+# 缓存的数据格式变化时需要修改，旧的缓存会自动失效
+CACHE_VERSION = 3
+
+# 进程内缓存文件的hash，文件修改之后自动失效
+_file_hashes = {}
+
+
+def get_file_hash(file_path):
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    if key not in _file_hashes:
+        hasher = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(block)
+        _file_hashes[key] = hasher.hexdigest()
+    return _file_hashes[key]
+
+
+def get_cache_key(file_path, params):
+    content = json.dumps([CACHE_VERSION, get_file_hash(file_path), params], sort_keys=True, default=str)
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+# 每个矩阵保存为单独的.npy文件，加载时使用内存映射，只有实际访问到的数据才会被读入内存
+def save_prepared_data(cache_dir, key, arrays, meta):
+    cache_dir = os.path.expanduser(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    # 先写入临时目录再重命名，多个进程同时写入同一个缓存时不会读到不完整的数据
+    temp_dir = tempfile.mkdtemp(dir=cache_dir, prefix=f".{key}-")
+    for name, array in arrays.items():
+        np.save(f"{temp_dir}/{name}.npy", np.ascontiguousarray(array))
+    with open(f"{temp_dir}/meta.json", 'w') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    try:
+        os.rename(temp_dir, f"{cache_dir}/{key}")
+    except OSError:
+        # 其它进程已经写入了相同的缓存
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def load_prepared_data(cache_dir, key):
+    data_dir = f"{os.path.expanduser(cache_dir)}/{key}"
+    if not os.path.exists(f"{data_dir}/meta.json"):
+        return None
+    with open(f"{data_dir}/meta.json") as f:
+        meta = json.load(f)
+    arrays = {
+        file[:-len('.npy')]: np.load(f"{data_dir}/{file}", mmap_mode='r')
+        for file in os.listdir(data_dir) if file.endswith('.npy')
+    }
+    return arrays, meta
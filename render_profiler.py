@@ -0,0 +1,133 @@
+import contextlib
+import json
+import time
+import numpy as np
+
+
+class RenderProfiler:
+    """记录预处理各阶段和每一帧的耗时
+
+    每一帧的耗时分为update（更新artist）、draw（绘制）和encode（编码），
+    VideoWriterType.MATPLOTLIB由animation负责绘制和编码，只能统计两者的总和，记录在draw中，encode为None
+    阶段可以嵌套，例如render包括concat
+    """
+
+    def __init__(self, sample_frame_count=0):
+        self.phase_times = {}
+        # 每一帧：[update, draw, encode, artist数量]
+        self.frame_records = []
+        self.sample_frame_count = sample_frame_count
+        self.sampled_frames = set()
+        self.profile = None
+        # 使用cProfile分析的帧的统计数据，pstats.Stats
+        self.profile_stats = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[name] = self.phase_times.get(name, 0) + time.perf_counter() - start
+
+    # 在frame_count帧中均匀选取需要分析的帧
+    def set_frame_count(self, frame_count):
+        sample_frame_count = min(self.sample_frame_count, frame_count)
+        self.sampled_frames = set(np.linspace(0, frame_count - 1, sample_frame_count).round().astype(int).tolist())
+
+    # 子进程中使用的记录器，需要分析的帧保持不变
+    def fork(self):
+        profiler = RenderProfiler(self.sample_frame_count)
+        profiler.sampled_frames = self.sampled_frames
+        return profiler
+
+    def start_frame(self, frame_number):
+        if self.profile:
+            # 上一次更新之后没有保存帧，例如animation初始化时的更新
+            self.profile.disable()
+            self.profile = None
+        if frame_number in self.sampled_frames:
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def end_frame(self, update_time, draw_time, encode_time, artist_count):
+        if self.profile:
+            self.profile.disable()
+            self._add_profile_stats(self.profile)
+            self.profile = None
+        self.frame_records.append([update_time, draw_time, encode_time, artist_count])
+
+    def _add_profile_stats(self, profile):
+        import pstats
+        if self.profile_stats is None:
+            self.profile_stats = pstats.Stats(profile)
+        else:
+            self.profile_stats.add(profile)
+
+    # 子进程中的记录，pstats.Stats不能pickle，只传递其中的统计数据
+    def get_state(self):
+        return {
+            'frame_records': self.frame_records,
+            'profile_stats': self.profile_stats.stats if self.profile_stats else None,
+        }
+
+    def merge_state(self, state):
+        self.frame_records.extend(state['frame_records'])
+        if state['profile_stats']:
+            import pstats
+            stats = pstats.Stats()
+            stats.stats = state['profile_stats']
+            if self.profile_stats is None:
+                self.profile_stats = pstats.Stats()
+            self.profile_stats.add(stats)
+
+    @staticmethod
+    def _get_percentiles(values):
+        values = np.asarray(values)
+        values = values[~np.isnan(values)] * 1000
+        if not len(values):
+            return None
+        return {
+            'mean_ms': round(float(values.mean()), 3),
+            'p50_ms': round(float(np.percentile(values, 50)), 3),
+            'p90_ms': round(float(np.percentile(values, 90)), 3),
+            'p99_ms': round(float(np.percentile(values, 99)), 3),
+            'max_ms': round(float(values.max()), 3),
+        }
+
+    def build_report(self, info, top_function_count=30):
+        records = np.array(self.frame_records, dtype=float).reshape(-1, 4)
+        report = {
+            **info,
+            'phases_s': {name: round(seconds, 4) for name, seconds in self.phase_times.items()},
+            'frames': {
+                'count': len(records),
+                'update': self._get_percentiles(records[:, 0]),
+                'draw': self._get_percentiles(records[:, 1]),
+                'encode': self._get_percentiles(records[:, 2]),
+                'total': self._get_percentiles(np.nansum(records[:, :3], axis=1)),
+                'artists_mean': round(float(records[:, 3].mean()), 1) if len(records) else None,
+                'artists_max': int(records[:, 3].max()) if len(records) else None,
+            },
+        }
+        if self.profile_stats:
+            stats = sorted(self.profile_stats.stats.items(), key=lambda item: -item[1][3])[:top_function_count]
+            report['profiled_frames'] = len(self.sampled_frames)
+            report['top_functions'] = [
+                {
+                    'function': f"{file}:{line}({name})",
+                    'calls': calls,
+                    'total_time_s': round(total_time, 4),
+                    'cumulative_time_s': round(cumulative_time, 4),
+                }
+                for (file, line, name), (_, calls, total_time, cumulative_time, _) in stats
+            ]
+        return report
+
+    def save(self, path, info):
+        with open(path, 'w') as file:
+            json.dump(self.build_report(info), file, indent=4, ensure_ascii=False)
+        if self.profile_stats:
+            # 可以使用snakeviz等工具查看
+            self.profile_stats.dump_stats(f"{path[:-len('.json')]}.prof")
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from chart_types import init_matplotlib, make_dataset
+
+
+# 所有测试共用的小数据集：12个种类 x 4个时间段，以及对应的图标
+@pytest.fixture(scope='session')
+def data_dir(tmp_path_factory):
+    init_matplotlib()
+    data_dir = tmp_path_factory.mktemp('data')
+    make_dataset(str(data_dir), 12, 4)
+    return str(data_dir)
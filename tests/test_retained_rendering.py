@@ -0,0 +1,11 @@
+import pytest
+
+from retained_diff import CASES, compare_case
+
+
+# enable_retained_rendering与每一帧ax.clear()重建的画面必须逐像素一致
+@pytest.mark.parametrize('name, chart_type_name, params', CASES, ids=[case[0] for case in CASES])
+def test_retained_rendering_matches_rebuilt_frames(data_dir, name, chart_type_name, params):
+    frame_count, changed_frame_count, max_changed_pixels = compare_case(chart_type_name, params, data_dir, 6)
+    assert frame_count == 6
+    assert changed_frame_count == 0, f"最多{max_changed_pixels}个像素不同"
@@ -0,0 +1,11 @@
+import pytest
+
+from text_raster_diff import CHART_TYPES, MAX_CHANGED_RATIO, MAX_STRONG_RATIO, compare_chart_type
+
+
+# 栅格化的文字锚点对齐到整数像素，只允许文字边缘有少量差异
+@pytest.mark.parametrize('chart_type_name', CHART_TYPES)
+def test_fast_text_rendering_matches_normal_text(data_dir, chart_type_name):
+    result = compare_chart_type(chart_type_name, data_dir, 6)
+    assert result['changed_ratio'] <= MAX_CHANGED_RATIO
+    assert result['strong_ratio'] <= MAX_STRONG_RATIO
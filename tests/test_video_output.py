@@ -0,0 +1,59 @@
+import os
+import shutil
+import subprocess
+
+import matplotlib
+import pytest
+
+from chart_types import create_generator
+from chart_constants import VideoWriterType
+
+
+@pytest.fixture
+def ffmpeg_path():
+    ffmpeg_path = shutil.which(matplotlib.rcParams['animation.ffmpeg_path'])
+    if ffmpeg_path is None:
+        pytest.skip("没有安装ffmpeg")
+    return ffmpeg_path
+
+
+def generate_video(data_dir, output_dir, **params):
+    generator = create_generator('H_BAR', data_dir, output_dir=str(output_dir), frame_interval=100,
+                                 video_writer_type=VideoWriterType.RAW_PIPE, progress_callback=lambda i, n: None,
+                                 **params)
+    generator.generate()
+    return generator
+
+
+# 解码为单通道的原始像素，通过输出的字节数计算视频帧数
+def count_video_frames(ffmpeg_path, generator):
+    width, height = generator.fig.canvas.get_width_height()
+    result = subprocess.run([ffmpeg_path, '-loglevel', 'error', '-i', generator.video_save_path, '-f', 'rawvideo',
+                             '-pix_fmt', 'gray', '-'], capture_output=True, check=True)
+    return len(result.stdout) // (width * height)
+
+
+def test_raw_pipe(data_dir, tmp_path, ffmpeg_path):
+    generator = generate_video(data_dir, tmp_path)
+    assert count_video_frames(ffmpeg_path, generator) == generator.frame_count
+
+
+# 两个进程分别渲染一半的帧，拼接之后删除片段目录
+def test_parallel_segments_are_concatenated(data_dir, tmp_path, ffmpeg_path):
+    generator = generate_video(data_dir, tmp_path, render_process_count=2)
+    assert count_video_frames(ffmpeg_path, generator) == generator.frame_count
+    assert not os.path.exists(f"{tmp_path}/视频片段")
+
+
+# 第二次生成时输入没有变化，所有片段都直接使用第一次的结果
+def test_incremental_segments_are_reused(data_dir, tmp_path, ffmpeg_path):
+    generator = generate_video(data_dir, tmp_path, incremental_render=True, incremental_segment_frame_count=20)
+    segments_dir = f"{tmp_path}/视频片段缓存"
+    segment_times = {file: os.path.getmtime(f"{segments_dir}/{file}") for file in os.listdir(segments_dir)}
+    assert len([file for file in segment_times if file.endswith('.mp4')]) == -(-generator.frame_count // 20)
+
+    generator = generate_video(data_dir, tmp_path, incremental_render=True, incremental_segment_frame_count=20)
+    for file, mtime in segment_times.items():
+        if file.endswith('.mp4'):
+            assert os.path.getmtime(f"{segments_dir}/{file}") == mtime
+    assert count_video_frames(ffmpeg_path, generator) == generator.frame_count
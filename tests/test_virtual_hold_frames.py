@@ -0,0 +1,12 @@
+import pytest
+
+from virtual_hold_frames_check import CHART_TYPES, compare_chart_type
+
+
+# 不复制定格帧的数据行时，每一帧的数字文字必须完全相同，除折线图之外画面也必须相同
+@pytest.mark.parametrize('chart_type_name', CHART_TYPES)
+def test_virtual_hold_frames_matches_replicated_rows(data_dir, chart_type_name):
+    frame_count, label_diff_count, pixel_diff_count = compare_chart_type(chart_type_name, data_dir, 4)
+    assert label_diff_count == 0
+    if chart_type_name != 'LINE_CHART':
+        assert pixel_diff_count == 0
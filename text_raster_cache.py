@@ -0,0 +1,147 @@
+from collections import OrderedDict
+import math
+
+import numpy as np
+from matplotlib.artist import Artist
+from matplotlib.backends.backend_agg import RendererAgg
+from matplotlib.figure import Figure
+from matplotlib.text import Text
+from matplotlib.transforms import IdentityTransform
+
+
+class TextRasterCache:
+    """文字栅格化缓存
+
+    相同的文字和样式只经过一次字体查找、排版和栅格化，之后直接绘制为图片
+    种类名称数量有限，一直保留；数字和时间等经常变化的文字第二次出现时才栅格化，按照LRU淘汰
+    """
+
+    def __init__(self, max_size=2048):
+        self.max_size = max_size
+        self.pinned_images = {}
+        self.images = OrderedDict()
+        # 只出现过一次的文字，例如插值过程中的数字
+        self.seen_keys = OrderedDict()
+        # 每个dpi一个用于排版的figure，不需要pickle
+        self._figures = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_figures'] = {}
+        return state
+
+    def get(self, text, style, dpi, pinned=False):
+        """返回(RGBA图片, 锚点在图片中距离左下角的像素位置)，style为Text的参数，第一次出现的文字返回None"""
+        key = (text, tuple(sorted((name, repr(value)) for name, value in style.items())), dpi)
+        if key in self.pinned_images:
+            return self.pinned_images[key]
+        if key in self.images:
+            self.images.move_to_end(key)
+            return self.images[key]
+        if not pinned and key not in self.seen_keys:
+            self._add_to_lru(self.seen_keys, key, None)
+            return None
+
+        raster = self._rasterize(text, style, dpi)
+        if pinned:
+            self.pinned_images[key] = raster
+        else:
+            self.seen_keys.pop(key, None)
+            self._add_to_lru(self.images, key, raster)
+        return raster
+
+    def _add_to_lru(self, items, key, value):
+        items[key] = value
+        if len(items) > self.max_size:
+            items.popitem(last=False)
+
+    def _rasterize(self, text, style, dpi):
+        if dpi not in self._figures:
+            self._figures[dpi] = Figure(dpi=dpi)
+        text_artist = Text(0, 0, text, transform=IdentityTransform(), **style)
+        text_artist.set_figure(self._figures[dpi])
+
+        # 先以(0, 0)为锚点计算文字和边框的范围，锚点放在整数像素上
+        renderer = RendererAgg(1, 1, dpi)
+        extents = [text_artist.get_window_extent(renderer)]
+        if text_artist.get_bbox_patch():
+            text_artist.update_bbox_position_size(renderer)
+            extents.append(text_artist.get_bbox_patch().get_window_extent(renderer))
+        x_min = min(extent.x0 for extent in extents)
+        y_min = min(extent.y0 for extent in extents)
+        x_max = max(extent.x1 for extent in extents)
+        y_max = max(extent.y1 for extent in extents)
+        margin = 4
+        anchor_x = margin - math.floor(x_min)
+        anchor_y = margin - math.floor(y_min)
+        width = anchor_x + math.ceil(x_max) + margin
+        height = anchor_y + math.ceil(y_max) + margin
+
+        renderer = RendererAgg(width, height, dpi)
+        text_artist.set_position((anchor_x, anchor_y))
+        text_artist.draw(renderer)
+        # renderer.draw_image的图片第0行是最下面一行，与buffer_rgba相反
+        image = np.asarray(renderer.buffer_rgba())[::-1]
+
+        # 去掉透明的边缘
+        rows = np.flatnonzero(image[:, :, 3].any(axis=1))
+        columns = np.flatnonzero(image[:, :, 3].any(axis=0))
+        if not len(rows):
+            return np.zeros((0, 0, 4), dtype=np.uint8), (0, 0)
+        image = np.ascontiguousarray(image[rows[0]:rows[-1] + 1, columns[0]:columns[-1] + 1])
+        return image, (anchor_x - columns[0], anchor_y - rows[0])
+
+
+class RasterText(Artist):
+    """与ax.annotate/ax.text显示相同的文字，但绘制时使用TextRasterCache中的图片，没有图片时直接绘制文字
+
+    xy为锚点在transform中的坐标，offset为锚点的偏移（单位：point），与annotate的xytext和textcoords='offset points'一致
+    """
+    zorder = 3
+
+    def __init__(self, cache, text, xy, style, offset=(0, 0), pinned=False, clip_to_axes=True):
+        super().__init__()
+        self.cache = cache
+        self.text = text
+        self.xy = xy
+        self.style = style
+        self.offset = offset
+        self.pinned = pinned
+        # 与xycoords='data'的annotate一致：锚点在坐标轴范围之外时不显示
+        self.clip_to_axes = clip_to_axes
+
+    def set_text(self, text):
+        self.text = text
+        self.stale = True
+
+    def get_text(self):
+        return self.text
+
+    def set_position(self, xy):
+        self.xy = xy
+        self.stale = True
+
+    def draw(self, renderer):
+        if not self.get_visible() or self.text == '':
+            return
+        x, y = self.get_transform().transform(self.xy)
+        if self.clip_to_axes and self.axes is not None and not self.axes.contains_point((x, y)):
+            return
+        pixels_per_point = renderer.points_to_pixels(1)
+        x += self.offset[0] * pixels_per_point
+        y += self.offset[1] * pixels_per_point
+        raster = self.cache.get(self.text, self.style, renderer.dpi, self.pinned)
+        if raster is None:
+            text_artist = Text(x, y, self.text, transform=IdentityTransform(), **self.style)
+            text_artist.set_figure(self.figure)
+            text_artist.draw(renderer)
+            self.stale = False
+            return
+
+        image, (anchor_x, anchor_y) = raster
+        if not image.size:
+            return
+        gc = renderer.new_gc()
+        renderer.draw_image(gc, round(x) - anchor_x, round(y) - anchor_y, image)
+        gc.restore()
+        self.stale = False
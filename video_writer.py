@@ -0,0 +1,47 @@
+import subprocess
+import tempfile
+import matplotlib
+
+
+class RawVideoPipeWriter:
+    """将RGBA帧数据直接写入常驻的ffmpeg进程，不经过savefig"""
+
+    def __init__(self, save_path, frame_size, fps, preset='medium', crf=23, pixel_format='yuv420p'):
+        self.save_path = save_path
+        self.frame_size = frame_size
+        self.fps = fps
+        self.preset = preset
+        self.crf = crf
+        self.pixel_format = pixel_format
+        self.process = None
+        self.stderr_file = None
+
+    def _get_command(self):
+        width, height = self.frame_size
+        return [
+            matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(self.fps), '-i', '-',
+            # yuv420p要求宽高都是偶数
+            '-vf', 'crop=trunc(iw/2)*2:trunc(ih/2)*2',
+            '-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf), '-pix_fmt', self.pixel_format,
+            self.save_path
+        ]
+
+    def __enter__(self):
+        # 错误输出写入临时文件，使用PIPE时如果在结束之前没有读取，ffmpeg写满管道后会阻塞，写入帧数据也随之卡住
+        self.stderr_file = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(self._get_command(), stdin=subprocess.PIPE, stderr=self.stderr_file)
+        return self
+
+    def write_frame(self, rgba_buffer):
+        # rgba_buffer为fig.canvas.buffer_rgba()返回的memoryview，无需复制
+        self.process.stdin.write(rgba_buffer)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.process.stdin.close()
+        self.process.wait()
+        self.stderr_file.seek(0)
+        error_output = self.stderr_file.read()
+        self.stderr_file.close()
+        if self.process.returncode != 0 and exc_type is None:
+            raise subprocess.CalledProcessError(self.process.returncode, self._get_command(), stderr=error_output)